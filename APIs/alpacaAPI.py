@@ -1,8 +1,15 @@
 import requests
 import os
 import logging
+import random
+import threading
+import time
+from requests.adapters import HTTPAdapter
+from pymongo import UpdateOne
 from dotenv import load_dotenv
-from pymongo import MongoClient
+from DB import dbConnection
+from utils.metrics import timed
+from utils.orderTracker import TERMINAL_STATUSES, get_order_tracker
 from datetime import datetime
 
 load_dotenv()
@@ -13,34 +20,113 @@ API_SECRET = os.getenv("ALPACA_API_SECRET")
 BASE_TRADE_URL = "https://paper-api.alpaca.markets/v2"
 BASE_MARKET_URL = "https://data.alpaca.markets/v2" 
 
-# MongoDB Connection
-MONGO_URI = os.getenv("MONGO_URI")
-if not MONGO_URI:
-    raise ValueError("MONGO_URI is not set in the .env file")
+# HTTP settings: (connect, read) timeouts in seconds, retries for 429/5xx
+CONNECT_TIMEOUT = float(os.getenv("ALPACA_CONNECT_TIMEOUT", 3.05))
+READ_TIMEOUT = float(os.getenv("ALPACA_READ_TIMEOUT", 10))
+MAX_RETRIES = int(os.getenv("ALPACA_MAX_RETRIES", 3))
+BACKOFF_BASE = float(os.getenv("ALPACA_BACKOFF_BASE", 0.5))
+BACKOFF_MAX = float(os.getenv("ALPACA_BACKOFF_MAX", 8))
+POOL_SIZE = int(os.getenv("ALPACA_POOL_SIZE", 10))
+RETRY_STATUSES = {429, 500, 502, 503, 504}
 
-client = MongoClient(MONGO_URI)
-db = client["tradingData"]
-trades_collection = db["executed_trades"]
-stock_data_collection = db["stock_data"]
-account_data_collection = db["account_info"]
-portfolio_collection = db["portfolio"]
+# Symbols per multi-symbol latest-quotes request
+QUOTE_BATCH_SIZE = int(os.getenv("ALPACA_QUOTE_BATCH_SIZE", 200))
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class AlpacaClient:
+    """
+    Keep-alive session for the Alpaca trading and market data APIs: one pooled
+    requests.Session with the auth headers set once, explicit timeouts, and
+    retries with jittered exponential backoff on 429 and 5xx responses.
+    """
+
+    def __init__(self, api_key=API_KEY, api_secret=API_SECRET, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+                 max_retries=MAX_RETRIES, pool_size=POOL_SIZE):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.session = requests.Session()
+        self.session.headers.update({
+            "APCA-API-KEY-ID": api_key,
+            "APCA-API-SECRET-KEY": api_secret
+        })
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+
+    def _backoff(self, attempt, retry_after=None):
+        """Sleep before the next attempt: Retry-After if given, else full-jitter backoff."""
+        if retry_after and retry_after.isdigit():
+            delay = min(float(retry_after), BACKOFF_MAX)
+        else:
+            delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+        time.sleep(delay)
+
+    def request(self, method, url, idempotent=None, **kwargs):
+        """
+        Send a request through the pooled session. GETs are retried on 429/5xx and
+        connection errors; other methods only on 429, which Alpaca returns before
+        acting, so an order is never submitted twice by a retry. idempotent=True
+        opts a non-GET into full retries (an order carrying a client_order_id).
+        """
+        if idempotent is None:
+            idempotent = method.upper() == "GET"
+        retry_statuses = RETRY_STATUSES if idempotent else {429}
+        kwargs.setdefault("timeout", self.timeout)
+
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if not idempotent or last_attempt:
+                    raise
+                logger.warning(f"🔁 {method} {url} failed ({e}), retrying...")
+                self._backoff(attempt)
+                continue
+
+            if response.status_code in retry_statuses and not last_attempt:
+                logger.warning(f"🔁 {method} {url} returned {response.status_code}, retrying...")
+                self._backoff(attempt, response.headers.get("Retry-After"))
+                continue
+
+            return response
+
+    def timed_request(self, method, url, **kwargs):
+        """request() recorded as the "alpaca.<method>" stage; 4xx/5xx count as errors."""
+        with timed(f"alpaca.{method.lower()}") as stage:
+            response = self.request(method, url, **kwargs)
+            if response.status_code >= 400:
+                stage.error()
+            return response
+
+    def get(self, url, **kwargs):
+        return self.timed_request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.timed_request("POST", url, **kwargs)
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """The shared AlpacaClient, created on first use and reused across warm invocations."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = AlpacaClient()
+    return _client
+
 def get_account_info():
     """
     Retrieves account details including buying power and cash balance.
     """
     url = f"{BASE_TRADE_URL}/account"
-    headers = {
-        "APCA-API-KEY-ID": API_KEY,
-        "APCA-API-SECRET-KEY": API_SECRET
-    }
 
     try:
-        response = requests.get(url, headers=headers)
+        response = get_client().get(url)
         response.raise_for_status()
         account_info = response.json()
 
@@ -51,7 +137,7 @@ def get_account_info():
             "portfolio_value": account_info["equity"],
             "timestamp": datetime.utcnow()
         }
-        account_data_collection.insert_one(account_data)
+        dbConnection.account_data_collection.insert_one(account_data)
         logger.info(f"✅ Account Info Stored: {account_data}")
 
         return account_info
@@ -64,13 +150,9 @@ def get_portfolio_positions():
     Retrieves current holdings in the portfolio.
     """
     url = f"{BASE_TRADE_URL}/positions"
-    headers = {
-        "APCA-API-KEY-ID": API_KEY,
-        "APCA-API-SECRET-KEY": API_SECRET
-    }
 
     try:
-        response = requests.get(url, headers=headers)
+        response = get_client().get(url)
         response.raise_for_status()
         positions = response.json()
 
@@ -88,7 +170,7 @@ def get_portfolio_positions():
 
         # Store in MongoDB
         if portfolio_data:
-            portfolio_collection.insert_many(portfolio_data)
+            dbConnection.portfolio_collection.insert_many(portfolio_data)
             logger.info(f"✅ Portfolio Positions Stored: {portfolio_data}")
         else:
             logger.info("📉 No open positions.")
@@ -98,41 +180,47 @@ def get_portfolio_positions():
         logger.error(f"❌ Failed to fetch portfolio positions: {e}")
         return None
 
+def build_stock_info(symbol, quote):
+    """
+    Turn an Alpaca quote into the stock_data record.
+    Adds the bid-ask spread. A REST quote carries no traded volume (bs/as are
+    the sizes at the bid/ask), so volume is None; the streaming quote book
+    (APIs/alpacaStream.py) fills it from trades and minute bars.
+    """
+    bid_price = quote["bp"]
+    ask_price = quote["ap"]
+    spread = round(ask_price - bid_price, 2)  # ✅ New metric: bid-ask spread
+    last_trade_price = (bid_price + ask_price) / 2
+
+    return {
+        "symbol": symbol,
+        "bid_price": bid_price,
+        "ask_price": ask_price,
+        "bid_size": quote.get("bs"),
+        "ask_size": quote.get("as"),
+        "last_trade_price": last_trade_price,
+        "spread": spread,
+        "volume": None,
+        "timestamp": datetime.utcnow(),
+        "source": "rest"
+    }
+
 def get_stock_data(symbol):
     """
     Retrieves the latest stock market data for a given symbol from Alpaca.
     Returns additional useful trading metrics like volume and bid-ask spread.
     """
     url = f"{BASE_MARKET_URL}/stocks/{symbol}/quotes/latest"
-    headers = {
-        "APCA-API-KEY-ID": API_KEY,
-        "APCA-API-SECRET-KEY": API_SECRET
-    }
 
     try:
-        response = requests.get(url, headers=headers)
+        response = get_client().get(url)
         response.raise_for_status()
         data = response.json()
 
-        # Extract stock price data and alternative trading metrics
-        bid_price = data["quote"]["bp"]
-        ask_price = data["quote"]["ap"]
-        spread = round(ask_price - bid_price, 2)  # ✅ New metric: bid-ask spread
-        last_trade_price = (bid_price + ask_price) / 2
-        volume = data["quote"].get("bv", 0)  # ✅ New metric: trading volume
-
-        stock_info = {
-            "symbol": symbol,
-            "bid_price": bid_price,
-            "ask_price": ask_price,
-            "last_trade_price": last_trade_price,
-            "spread": spread,
-            "volume": volume,
-            "timestamp": datetime.utcnow()
-        }
+        stock_info = build_stock_info(symbol, data["quote"])
 
         # Store in MongoDB
-        stock_data_collection.insert_one(stock_info)
+        dbConnection.stock_data_collection.insert_one(stock_info)
         logger.info(f"✅ Stock Data Stored: {stock_info}")
 
         return stock_info
@@ -140,16 +228,62 @@ def get_stock_data(symbol):
         logger.error(f"❌ Failed to get stock data: {e}")
         return None
 
-def place_trade(symbol, qty, side, order_type="market", time_in_force="gtc"):
+def get_stock_data_many(symbols):
     """
-    Places a trade on Alpaca Paper Trading account and logs it in MongoDB.
+    Latest quotes for many symbols from the multi-symbol endpoint, stored with a
+    single insert_many. Returns {symbol: stock_info}; symbols Alpaca has no
+    quote for are left out. Large universes are split into QUOTE_BATCH_SIZE requests.
+    """
+    # Sorted, so the same symbols always make the same requests (and cassette keys)
+    symbols = sorted(set(symbols))
+    url = f"{BASE_MARKET_URL}/stocks/quotes/latest"
+    stock_infos = {}
+
+    try:
+        for start in range(0, len(symbols), QUOTE_BATCH_SIZE):
+            batch = symbols[start:start + QUOTE_BATCH_SIZE]
+            response = get_client().get(url, params={"symbols": ",".join(batch)})
+            response.raise_for_status()
+
+            for symbol, quote in response.json().get("quotes", {}).items():
+                stock_infos[symbol] = build_stock_info(symbol, quote)
+    except requests.exceptions.RequestException as e:
+        logger.error(f"❌ Failed to get stock data: {e}")
+        return None
+
+    # Store in MongoDB (insert_many adds _id to the records, so store copies)
+    if stock_infos:
+        dbConnection.stock_data_collection.insert_many([dict(info) for info in stock_infos.values()])
+        logger.info(f"✅ Stock Data Stored for {len(stock_infos)} symbols")
+
+    return stock_infos
+
+def get_order_by_client_id(client_order_id):
+    """The order submitted with this client_order_id, or None if there is none."""
+    url = f"{BASE_TRADE_URL}/orders:by_client_order_id"
+    response = get_client().get(url, params={"client_order_id": client_order_id})
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    return response.json()
+
+def get_open_orders():
+    """Every open order on the account (one page of up to 500, the API's maximum)."""
+    url = f"{BASE_TRADE_URL}/orders"
+    response = get_client().get(url, params={"status": "open", "limit": 500})
+    response.raise_for_status()
+    return response.json()
+
+def submit_order(symbol, qty, side, client_order_id=None, order_type="market", time_in_force="gtc"):
+    """
+    Submit an order and return Alpaca's order object, without storing it.
+    With a client_order_id the request is retried like a GET: if an earlier
+    attempt did reach Alpaca, the retry is rejected as a duplicate (422) and
+    the order that attempt created is returned instead of a second one. If that
+    order has already been canceled, rejected or expired, None is returned:
+    nothing was placed, and the id can't be used again.
     """
     url = f"{BASE_TRADE_URL}/orders"
-    headers = {
-        "APCA-API-KEY-ID": API_KEY,
-        "APCA-API-SECRET-KEY": API_SECRET,
-        "Content-Type": "application/json"
-    }
     order_data = {
         "symbol": symbol,
         "qty": qty,
@@ -157,28 +291,65 @@ def place_trade(symbol, qty, side, order_type="market", time_in_force="gtc"):
         "type": order_type,
         "time_in_force": time_in_force
     }
-
-    try:
-        response = requests.post(url, json=order_data, headers=headers)
+    if client_order_id:
+        order_data["client_order_id"] = client_order_id
+
+    response = get_client().post(url, json=order_data, idempotent=bool(client_order_id))
+    trade_info = None
+    if response.status_code == 422 and client_order_id:
+        trade_info = get_order_by_client_id(client_order_id)
+        if trade_info and trade_info["status"] in TERMINAL_STATUSES - {"filled"}:
+            logger.warning(f"⚠️ Order {client_order_id} was already submitted and is {trade_info['status']}, not placed")
+            return None
+        if trade_info:
+            logger.info(f"♻️ Order {client_order_id} already submitted ({trade_info['status']}), reusing it")
+    if trade_info is None:
         response.raise_for_status()
         trade_info = response.json()
-        
+
+    tracker = get_order_tracker()
+    if tracker:
+        tracker.track(trade_info)
+    return trade_info
+
+def trade_record_update(trade_info):
+    """
+    UpdateOne storing an order in executed_trades, keyed by order_id. With order
+    tracking running, trade_updates events may already have created the record
+    with a later status, so status and fill only fill in what's missing.
+    """
+    trade_record = {
+        "symbol": trade_info["symbol"],
+        "qty": trade_info["qty"],
+        "side": trade_info["side"],
+        "order_type": trade_info["type"],
+        "time_in_force": trade_info["time_in_force"],
+        "client_order_id": trade_info.get("client_order_id"),
+        "submitted_at": trade_info["submitted_at"],
+        "created_at": datetime.utcnow()
+    }
+    return UpdateOne(
+        {"order_id": trade_info["id"]},
+        {
+            "$set": trade_record,
+            "$setOnInsert": {"status": trade_info["status"], "filled_avg_price": trade_info.get("filled_avg_price", None)}
+        },
+        upsert=True
+    )
+
+def place_trade(symbol, qty, side, order_type="market", time_in_force="gtc", client_order_id=None):
+    """
+    Places a trade on Alpaca Paper Trading account and logs it in MongoDB.
+    """
+    try:
+        trade_info = submit_order(symbol, qty, side, client_order_id, order_type, time_in_force)
+        if trade_info is None:
+            return None
         logger.info(f"✅ Trade Successful: {trade_info}")
 
         # Store trade info in MongoDB
-        trade_record = {
-            "symbol": trade_info["symbol"],
-            "qty": trade_info["qty"],
-            "side": trade_info["side"],
-            "order_type": trade_info["type"],
-            "time_in_force": trade_info["time_in_force"],
-            "filled_avg_price": trade_info.get("filled_avg_price", None),
-            "status": trade_info["status"],
-            "submitted_at": trade_info["submitted_at"],
-            "created_at": datetime.utcnow()
-        }
-        trades_collection.insert_one(trade_record)
-        logger.info(f"✅ Trade recorded in MongoDB: {trade_record}")
+        dbConnection.trades_collection.bulk_write([trade_record_update(trade_info)])
+        logger.info(f"✅ Trade recorded in MongoDB for order {trade_info['id']}")
 
         return trade_info
     except requests.exceptions.RequestException as e:
@@ -190,13 +361,9 @@ def check_stock_ownership(symbol):
     Checks if the user owns shares of a stock in their Alpaca portfolio.
     """
     url = f"{BASE_TRADE_URL}/positions/{symbol}"
-    headers = {
-        "APCA-API-KEY-ID": API_KEY,
-        "APCA-API-SECRET-KEY": API_SECRET
-    }
 
     try:
-        response = requests.get(url, headers=headers)
+        response = get_client().get(url)
         if response.status_code == 200:
             position = response.json()
             return int(position["qty"])
@@ -0,0 +1,352 @@
+import abc
+import gzip
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+load_dotenv()
+
+API_KEY = os.getenv("ALPACA_API_KEY")
+API_SECRET = os.getenv("ALPACA_API_SECRET")
+# Market data stream; the free "iex" feed or "sip" with a paid subscription
+DATA_FEED = os.getenv("ALPACA_DATA_FEED", "iex")
+MARKET_STREAM_URL = os.getenv("ALPACA_MARKET_STREAM_URL", f"wss://stream.data.alpaca.markets/v2/{DATA_FEED}")
+# Order events (trade_updates) for the paper trading account
+TRADE_STREAM_URL = os.getenv("ALPACA_TRADE_STREAM_URL", "wss://paper-api.alpaca.markets/stream")
+
+RECONNECT_BASE = float(os.getenv("ALPACA_STREAM_RECONNECT_BASE", 1))
+RECONNECT_MAX = float(os.getenv("ALPACA_STREAM_RECONNECT_MAX", 30))
+PING_INTERVAL = 20
+
+# Rolling volume and VWAP cover this many minutes of bars/trades
+VOLUME_MINUTES = int(os.getenv("QUOTE_BOOK_VOLUME_MINUTES", 30))
+# Quotes older than this (seconds since received) are treated as missing, so
+# readers fall back to REST instead of trading on a stalled stream
+MAX_QUOTE_AGE = float(os.getenv("QUOTE_BOOK_MAX_AGE", 15))
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def _minute(timestamp):
+    """Minute bucket of an RFC 3339 stream timestamp ("2024-05-01T14:30:12.123456789Z")."""
+    return datetime.strptime(timestamp[:16], "%Y-%m-%dT%H:%M")
+
+class QuoteBook:
+    """
+    Latest NBBO, last trade, and rolling volume/VWAP per symbol, fed by the
+    market data stream and read by the trading loop without any network call.
+    Minute volume comes from trades until that minute's bar arrives, then the
+    bar replaces it.
+    """
+
+    def __init__(self, volume_minutes=VOLUME_MINUTES, max_age=MAX_QUOTE_AGE, clock=time.time):
+        self.volume_minutes = volume_minutes
+        self.max_age = max_age
+        self.clock = clock
+        self.symbols = {}
+        self._lock = threading.Lock()
+
+    def _symbol(self, symbol):
+        book = self.symbols.get(symbol)
+        if book is None:
+            book = self.symbols[symbol] = {
+                "bid_price": None, "ask_price": None, "bid_size": None, "ask_size": None,
+                "quote_time": None, "received_at": None, "last_trade_price": None,
+                # minute -> [volume, notional, from_bar]
+                "minutes": OrderedDict()
+            }
+        return book
+
+    def _prune(self, book, latest_minute):
+        cutoff = latest_minute - timedelta(minutes=self.volume_minutes - 1)
+        minutes = book["minutes"]
+        while minutes and next(iter(minutes)) < cutoff:
+            minutes.popitem(last=False)
+
+    def apply(self, message):
+        """Apply one stream message: "q" quote, "t" trade or "b" minute bar. Others are ignored."""
+        kind = message.get("T")
+        if kind not in ("q", "t", "b"):
+            return
+        with self._lock:
+            book = self._symbol(message["S"])
+            if kind == "q":
+                book.update({
+                    "bid_price": message["bp"], "ask_price": message["ap"],
+                    "bid_size": message.get("bs"), "ask_size": message.get("as"),
+                    "quote_time": message.get("t"), "received_at": self.clock()
+                })
+                return
+
+            minute = _minute(message["t"])
+            if kind == "t":
+                book["last_trade_price"] = message["p"]
+                entry = book["minutes"].setdefault(minute, [0, 0.0, False])
+                if not entry[2]:
+                    entry[0] += message["s"]
+                    entry[1] += message["s"] * message["p"]
+            else:
+                book["minutes"][minute] = [message["v"], message["v"] * message.get("vw", message["c"]), True]
+                book["minutes"] = OrderedDict(sorted(book["minutes"].items()))
+            self._prune(book, max(book["minutes"]))
+
+    def stock_info(self, symbol):
+        """
+        stock_data-shaped record for the symbol (see alpacaAPI.build_stock_info),
+        plus vwap and sizes; None if there is no quote or it is stale.
+        """
+        with self._lock:
+            book = self.symbols.get(symbol)
+            if not book or book["received_at"] is None or self.clock() - book["received_at"] > self.max_age:
+                return None
+            bid_price, ask_price = book["bid_price"], book["ask_price"]
+            volume = sum(entry[0] for entry in book["minutes"].values())
+            notional = sum(entry[1] for entry in book["minutes"].values())
+            return {
+                "symbol": symbol,
+                "bid_price": bid_price,
+                "ask_price": ask_price,
+                "bid_size": book["bid_size"],
+                "ask_size": book["ask_size"],
+                "last_trade_price": book["last_trade_price"] or (bid_price + ask_price) / 2,
+                "spread": round(ask_price - bid_price, 2),
+                "volume": volume,
+                "vwap": round(notional / volume, 4) if volume else None,
+                "quote_time": book["quote_time"],
+                "timestamp": datetime.utcnow(),
+                "source": "stream"
+            }
+
+    def stock_infos(self, symbols):
+        """{symbol: stock_info} for the symbols with a fresh quote."""
+        infos = {}
+        for symbol in symbols:
+            info = self.stock_info(symbol)
+            if info:
+                infos[symbol] = info
+        return infos
+
+class StreamClient(threading.Thread, abc.ABC):
+    """
+    Websocket client that keeps itself connected: it authenticates and
+    re-subscribes after every (re)connect, with jittered exponential backoff
+    between attempts. Subclasses implement auth_message, subscribe_message,
+    is_authenticated and handle.
+    """
+
+    def __init__(self, url, name):
+        super().__init__(name=name, daemon=True)
+        self.url = url
+        self.app = None
+        self.authenticated = threading.Event()
+        self.stop_event = threading.Event()
+        self.reconnects = 0
+        self._send_lock = threading.Lock()
+
+    @abc.abstractmethod
+    def auth_message(self):
+        """Message sent as soon as the socket opens."""
+
+    @abc.abstractmethod
+    def subscribe_message(self):
+        """Message sent after every successful authentication."""
+
+    @abc.abstractmethod
+    def is_authenticated(self, payload):
+        """Whether payload is the server's auth success reply."""
+
+    @abc.abstractmethod
+    def handle(self, payload):
+        """Process one decoded message."""
+
+    def on_authenticated(self):
+        """Called on the stream thread after every successful (re)authentication."""
+
+    def send(self, message):
+        with self._send_lock:
+            if self.app and self.app.sock and self.app.sock.connected:
+                self.app.send(json.dumps(message))
+                return True
+        return False
+
+    def _on_open(self, app):
+        self.send(self.auth_message())
+
+    def _on_message(self, app, message):
+        payload = json.loads(message)
+        if not self.authenticated.is_set() and self.is_authenticated(payload):
+            self.authenticated.set()
+            self.reconnects = 0
+            logger.info(f"🔌 {self.name} connected to {self.url}")
+            self.send(self.subscribe_message())
+            try:
+                self.on_authenticated()
+            except Exception:
+                logger.exception(f"❌ {self.name} post-connect hook failed")
+        self.handle(payload)
+
+    def _on_error(self, app, error):
+        logger.warning(f"⚠️ {self.name} error: {error}")
+
+    def run(self):
+        import websocket
+
+        while not self.stop_event.is_set():
+            self.authenticated.clear()
+            self.app = websocket.WebSocketApp(
+                self.url, on_open=self._on_open, on_message=self._on_message, on_error=self._on_error
+            )
+            self.app.run_forever(ping_interval=PING_INTERVAL, ping_timeout=PING_INTERVAL / 2)
+            if self.stop_event.is_set():
+                break
+            delay = random.uniform(0, min(RECONNECT_MAX, RECONNECT_BASE * 2 ** self.reconnects))
+            self.reconnects += 1
+            logger.warning(f"🔁 {self.name} disconnected, reconnecting in {delay:.1f}s")
+            self.stop_event.wait(delay)
+
+    def stop(self, timeout=None):
+        self.stop_event.set()
+        app = self.app
+        if app:
+            app.keep_running = False
+            sock = app.sock
+            if sock and sock.sock:
+                # Wakes the dispatcher's select so run_forever tears down on its
+                # own thread; closing the socket from here instead can leave it
+                # waiting out ping_timeout
+                try:
+                    sock.sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+        self.join(timeout)
+
+class MarketDataStream(StreamClient):
+    """
+    Alpaca market data stream: quotes, trades and minute bars for a symbol set
+    that can grow while connected, applied to a QuoteBook. record_path appends
+    every data message to a gzipped JSONL file for the replay server.
+    """
+
+    def __init__(self, symbols, book, url=MARKET_STREAM_URL, api_key=API_KEY, api_secret=API_SECRET, record_path=None):
+        super().__init__(url, "market-stream")
+        self.symbols = set(symbols)
+        # subscribe() runs on caller threads while re-subscribes read the set on the stream thread
+        self._symbols_lock = threading.Lock()
+        self.book = book
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.record = gzip.open(record_path, "at", encoding="utf-8") if record_path else None
+        self.messages = 0
+
+    def auth_message(self):
+        return {"action": "auth", "key": self.api_key, "secret": self.api_secret}
+
+    def subscribe_message(self, symbols=None):
+        if symbols is None:
+            with self._symbols_lock:
+                symbols = set(self.symbols)
+        symbols = sorted(symbols)
+        return {"action": "subscribe", "quotes": symbols, "trades": symbols, "bars": symbols}
+
+    def is_authenticated(self, payload):
+        return any(message.get("T") == "success" and message.get("msg") == "authenticated" for message in payload)
+
+    def handle(self, payload):
+        for message in payload:
+            kind = message.get("T")
+            if kind in ("q", "t", "b"):
+                self.book.apply(message)
+                self.messages += 1
+                if self.record:
+                    self.record.write(json.dumps(message) + "\n")
+            elif kind == "error":
+                logger.error(f"❌ Market stream error {message.get('code')}: {message.get('msg')}")
+            elif kind == "subscription":
+                logger.info(f"📡 Subscribed to {len(message.get('quotes', []))} symbols")
+
+    def subscribe(self, symbols):
+        """Add symbols; sent right away if connected, and included in every re-subscribe."""
+        with self._symbols_lock:
+            new = set(symbols) - self.symbols
+            if not new:
+                return
+            self.symbols |= new
+        if self.authenticated.is_set():
+            self.send(self.subscribe_message(new))
+
+    def stop(self, timeout=None):
+        super().stop(timeout)
+        if self.record:
+            self.record.close()
+
+class TradeUpdatesStream(StreamClient):
+    """
+    Alpaca trading stream, listening to trade_updates: every order event (new,
+    fill, partial_fill, canceled, rejected, ...) is passed to on_update.
+    on_connect runs after every (re)authentication, before the events that follow.
+    """
+
+    def __init__(self, on_update, url=TRADE_STREAM_URL, api_key=API_KEY, api_secret=API_SECRET, on_connect=None):
+        super().__init__(url, "trade-updates")
+        self.on_update = on_update
+        self.on_connect = on_connect
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.events = 0
+
+    def auth_message(self):
+        return {"action": "auth", "key": self.api_key, "secret": self.api_secret}
+
+    def subscribe_message(self):
+        return {"action": "listen", "data": {"streams": ["trade_updates"]}}
+
+    def is_authenticated(self, payload):
+        return payload.get("stream") == "authorization" and payload.get("data", {}).get("status") == "authorized"
+
+    def on_authenticated(self):
+        if self.on_connect:
+            self.on_connect()
+
+    def handle(self, payload):
+        stream = payload.get("stream")
+        if stream == "trade_updates":
+            self.events += 1
+            self.on_update(payload["data"])
+        elif stream == "authorization" and payload.get("data", {}).get("status") != "authorized":
+            logger.error(f"❌ Trade stream authorization failed: {payload.get('data')}")
+        elif stream == "listening":
+            logger.info(f"📡 Listening to {payload.get('data', {}).get('streams')}")
+
+_book = None
+_stream = None
+
+def start_market_stream(symbols, url=MARKET_STREAM_URL, record_path=None):
+    """Start the process-wide market data stream and quote book (once); returns the stream."""
+    global _book, _stream
+    if _stream is None:
+        _book = QuoteBook()
+        _stream = MarketDataStream(symbols, _book, url, record_path=record_path)
+        _stream.start()
+    else:
+        _stream.subscribe(symbols)
+    return _stream
+
+def stop_market_stream(timeout=None):
+    global _book, _stream
+    if _stream is not None:
+        _stream.stop(timeout)
+    _book, _stream = None, None
+
+def get_quote_book():
+    """The live QuoteBook, or None when no stream is running (REST is used instead)."""
+    return _book
+
+def get_market_stream():
+    return _stream
@@ -1,76 +1,230 @@
 import requests
+import httpx
+import asyncio
 from datetime import datetime
 import os
 from dotenv import load_dotenv
-from DB.dbConnection import news_collection
+from DB import dbConnection
+from utils import clock
+from DB.watermarks import get_watermark, update_watermark
+from utils.metrics import timed
+from utils.sentimentSummary import prepare_documents, record_new_documents
+from utils.tradeEvents import publish_documents
 from baseAPI import BaseAPI
 
 load_dotenv()
 API_KEY = os.getenv("NEWS_API_KEY")
 
+NEWS_URL = "https://newsapi.org/v2/everything"
+NEWS_QUERY = "stock market OR investing OR trading"
+PAGES = range(1, 3)
+PAGE_SIZE = 50
+
 class NewsAPI(BaseAPI):
-    def fetch_financial_news(self):
-        url = "https://newsapi.org/v2/everything"
-        from_time = self.get_market_window_start().isoformat()
-        news_articles = []
+    def build_params(self, page, from_time):
+        """Query parameters for one page of the NewsAPI /everything endpoint."""
+        return {
+            "q": NEWS_QUERY,
+            "language": "en",
+            "sortBy": "publishedAt",
+            "from": from_time,
+            "apiKey": API_KEY,
+            "pageSize": PAGE_SIZE,
+            "page": page,
+        }
+
+    def get_fetch_start(self):
+        """
+        Start of the fetch window: the market window start, or the newest
+        publishedAt already ingested if that is later. Returns (start, watermark).
+        """
+        window_start = self.get_market_window_start()
+        watermark = get_watermark("news", NEWS_QUERY)
+        if not watermark:
+            return window_start, None
+
+        published = datetime.fromisoformat(watermark.replace("Z", "+00:00")).replace(tzinfo=None)
+        return max(window_start, published), watermark
+
+    def reached_watermark(self, page_articles, watermark):
+        """Results are newest first, so paging stops at a short page or the watermark."""
+        if len(page_articles) < PAGE_SIZE:
+            return True
+        return bool(watermark) and any(article.get("publishedAt", "") <= watermark for article in page_articles)
+
+    def drop_before_watermark(self, articles, watermark):
+        """Drop articles strictly older than the watermark before any DB lookups."""
+        if not watermark:
+            return articles
+        return [article for article in articles if article.get("publishedAt", "") >= watermark]
+
+    def store_and_advance(self, articles, watermark, complete):
+        """
+        Filter, score and store the fetched articles, then move the watermark,
+        but only if complete: paging reached the old watermark or a short page.
+        Otherwise (a failed page, or more pages than PAGES) older articles are
+        still unread, and the next run has to start from the old watermark again.
+        """
+        self.check_cancelled("scoring")
+        with timed("news.process") as stage:
+            stage.add_items(len(articles))
+            news_articles = self.process_articles(self.drop_before_watermark(articles, watermark))
+        self.check_cancelled("storing")
+        inserted = self.store_articles(news_articles)
+        published = [article["publishedAt"] for article in articles if article.get("publishedAt")]
+        if published and complete:
+            update_watermark("news", NEWS_QUERY, max(published))
+        elif published:
+            print("⚠️ News fetch stopped before the watermark, not advancing it")
+        return inserted
+
+    def filter_new_articles(self, articles):
+        """
+        Drop articles already stored (matched by url or title) with a single $in
+        query, plus repeats within the batch itself (syndicated headlines).
+        """
+        urls = list({article.get("url") for article in articles if article.get("url")})
+        titles = list({article.get("title") for article in articles if article.get("title")})
+
+        seen_urls, seen_titles = set(), set()
+        if urls or titles:
+            existing = dbConnection.news_collection.find(
+                {"$or": [{"url": {"$in": urls}}, {"title": {"$in": titles}}]},
+                {"url": 1, "title": 1, "_id": 0}
+            )
+            for doc in existing:
+                seen_urls.add(doc.get("url"))
+                seen_titles.add(doc.get("title"))
+
+        new_articles = []
+        for article in articles:
+            url = article.get("url")
+            title = article.get("title")
+            if (url and url in seen_urls) or (title and title in seen_titles):
+                continue
+            if url:
+                seen_urls.add(url)
+            if title:
+                seen_titles.add(title)
+            new_articles.append(article)
+
+        return new_articles
+
+    def process_articles(self, articles):
+        """
+        Filter raw NewsAPI articles down to new, tracked-stock documents.
+        Candidates are buffered and scored in one batch.
+        """
+        candidates = []
+
+        for article in self.filter_new_articles(articles):
+            title = article.get("title", "")
+            description = article.get("description", "")
+            content = article.get("content", "")
+            full_text = f"{title} {description} {content}"
+
+            mentions = self.extract_stock_mentions(full_text)
+            if not mentions:
+                continue
+
+            candidates.append((article, full_text, mentions))
 
-        for page in range(1, 3):
-            params = {
-                "q": "stock market OR investing OR trading",
-                "language": "en",
-                "sortBy": "publishedAt",
-                "from": from_time,
-                "apiKey": API_KEY,
-                "pageSize": 50,
-                "page": page,
+        texts = [full_text for _, full_text, _ in candidates]
+        sources = [article["source"]["name"] for article, _, _ in candidates]
+        sentiments = self.analyze_sentiment_many(texts)
+        impacts = self.calculate_expected_impact_many(texts, sentiments, sources)
+
+        news_articles = []
+        for (article, _, mentions), sentiment, expected_impact in zip(candidates, sentiments, impacts):
+            news_data = {
+                **self.stock_fields(mentions),
+                "title": article.get("title", ""),
+                "description": article.get("description", ""),
+                "content": article.get("content", ""),
+                "source": article["source"]["name"],
+                "published": article["publishedAt"],
+                "url": article.get("url"),
+                "timestamp": clock.utcnow(),
+                "sentiment": sentiment,
+                "expected_impact": expected_impact
             }
 
-            response = requests.get(url, params=params)
+            news_articles.append(news_data)
 
-            if response.status_code == 200:
-                data = response.json()
-
-                for article in data.get("articles", []):
-                    title = article.get("title", "")
-                    url = article.get("url")
-
-                    if news_collection.find_one({"$or": [{"url": url}, {"title": title}]}):
-                        continue
-
-                    description = article.get("description", "")
-                    content = article.get("content", "")
-                    source = article["source"]["name"]
-                    full_text = f"{title} {description} {content}"
-
-                    stock = self.get_tracked_stock(full_text)
-                    if not stock:
-                        continue
-
-                    sentiment = self.analyze_sentiment(full_text)
-                    expected_impact = self.calculate_expected_impact(full_text, sentiment, source)
-
-                    news_data = {
-                        "stock": stock,
-                        "title": title,
-                        "description": description,
-                        "content": content,
-                        "source": source,
-                        "published": article["publishedAt"],
-                        "url": url,
-                        "timestamp": datetime.utcnow(),
-                        "sentiment": sentiment,
-                        "expected_impact": expected_impact
-                    }
-
-                    news_articles.append(news_data)
+        return news_articles
+
+    def store_articles(self, news_articles):
+        """Insert filtered articles and return how many were written."""
+        inserted = dbConnection.insert_many_new(dbConnection.news_collection, prepare_documents(news_articles))
+        if inserted:
+            print(f"✅ Inserted {len(inserted)} filtered news articles into MongoDB!")
+            record_new_documents(dbConnection.news_collection, inserted)
+            publish_documents(inserted, "news")
+        return len(inserted)
 
+    def fetch_financial_news(self):
+        fetch_start, watermark = self.get_fetch_start()
+        from_time = fetch_start.isoformat()
+        articles = []
+        complete = False
+
+        for page in PAGES:
+            self.check_cancelled(f"page {page}")
+            with timed("news.fetch_page") as stage:
+                response = requests.get(NEWS_URL, params=self.build_params(page, from_time))
+                if response.status_code != 200:
+                    stage.error()
+
+            if response.status_code == 200:
+                page_articles = response.json().get("articles", [])
+                articles.extend(page_articles)
+                if self.reached_watermark(page_articles, watermark):
+                    complete = True
+                    break
             else:
                 print(f"❌ Error on page {page}: {response.status_code}, {response.text}")
                 break
 
-        if news_articles:
-            news_collection.insert_many(news_articles)
-            print(f"✅ Inserted {len(news_articles)} filtered news articles into MongoDB!")
+        # All pages are deduplicated together: one Mongo lookup per run
+        return self.store_and_advance(articles, watermark, complete)
+
+    async def fetch_financial_news_async(self):
+        """
+        Same as fetch_financial_news, but once the first page shows there is more
+        to read, the remaining pages are requested concurrently with httpx.
+        Filtering, scoring and the Mongo writes run in the loop's executor so they
+        don't stall other sources sharing the event loop.
+        """
+        loop = asyncio.get_running_loop()
+        fetch_start, watermark = await loop.run_in_executor(None, self.get_fetch_start)
+        from_time = fetch_start.isoformat()
+
+        async with httpx.AsyncClient() as client:
+            with timed("news.fetch_page") as stage:
+                first = await client.get(NEWS_URL, params=self.build_params(PAGES[0], from_time))
+                if first.status_code != 200:
+                    stage.error()
+            responses = [first]
+            if first.status_code == 200 and not self.reached_watermark(first.json().get("articles", []), watermark):
+                with timed("news.fetch_pages_concurrent") as stage:
+                    responses += await asyncio.gather(*[
+                        client.get(NEWS_URL, params=self.build_params(page, from_time)) for page in PAGES[1:]
+                    ])
+                    stage.add_items(len(PAGES) - 1)
+
+        articles = []
+        complete = False
+        for page, response in zip(PAGES, responses):
+            if response.status_code != 200:
+                print(f"❌ Error on page {page}: {response.status_code}, {response.text}")
+                break
+            page_articles = response.json().get("articles", [])
+            articles.extend(page_articles)
+            if self.reached_watermark(page_articles, watermark):
+                complete = True
+                break
+
+        return await loop.run_in_executor(None, self.store_and_advance, articles, watermark, complete)
 
 if __name__ == "__main__":
     news_api = NewsAPI()
@@ -1,71 +1,290 @@
-import praw
-from DB.dbConnection import reddit_collection
-from datetime import datetime
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from DB import dbConnection
+from DB.watermarks import get_watermarks, update_watermark
+from utils import clock
+from utils.metrics import timed
+from utils.sentimentSummary import prepare_documents, record_new_documents
+from utils.tradeEvents import publish_documents
 import os
-import itertools
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from baseAPI import BaseAPI
 
 # Load environment variables
 load_dotenv()
 
-reddit = praw.Reddit(
-    client_id=os.getenv("REDDIT_CLIENT_ID"),
-    client_secret=os.getenv("REDDIT_CLIENT_SECRET"),
-    user_agent=os.getenv("REDDIT_USER_AGENT")
-)
+_reddit = None
+_reddit_lock = threading.Lock()
+
+# Reddit's OAuth quota is per client id, shared by every praw instance below
+REQUESTS_PER_MINUTE = float(os.getenv("REDDIT_REQUESTS_PER_MINUTE", 100))
+
+def _build_reddit():
+    import praw
+    return praw.Reddit(
+        client_id=os.getenv("REDDIT_CLIENT_ID"),
+        client_secret=os.getenv("REDDIT_CLIENT_SECRET"),
+        user_agent=os.getenv("REDDIT_USER_AGENT")
+    )
+
+def get_reddit():
+    """
+    The praw client for the calling (main) thread. praw is imported and the
+    client built on first use, then reused by warm invocations. Fetch workers
+    use reddit_client() instead: praw instances are not thread-safe.
+    """
+    global _reddit
+    if _reddit is None:
+        with _reddit_lock:
+            if _reddit is None:
+                _reddit = _build_reddit()
+    return _reddit
+
+class RequestLimiter:
+    """
+    Spaces requests from every worker at least 60 / per_minute seconds apart,
+    since each praw instance's own rate limiter only sees its own requests.
+    """
+
+    def __init__(self, per_minute=REQUESTS_PER_MINUTE):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self.next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self.next_slot, now)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+limiter = RequestLimiter()
+
+# Idle praw clients for fetch workers; one is checked out per task, so no
+# client is ever used by two threads at once, and they survive across runs
+_worker_clients = queue.SimpleQueue()
+
+@contextmanager
+def reddit_client():
+    """Check out a praw client owned by the calling worker until the block exits."""
+    try:
+        client = _worker_clients.get_nowait()
+    except queue.Empty:
+        client = _build_reddit()
+    try:
+        yield client
+    finally:
+        _worker_clients.put(client)
+
+def __getattr__(name):
+    """Keep `redditAPI.reddit` working while the client stays lazy."""
+    if name == "reddit":
+        return get_reddit()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 SUBREDDITS = ["stocks", "wallstreetbets", "investing", "securityanalysis"]
+LISTINGS = ["hot", "rising"]
+LISTING_LIMIT = 50
+
+# Listings fetched in parallel, each worker on its own praw client; the shared
+# limiter keeps their combined rate within the quota, so this bounds
+# concurrency rather than raising the quota.
+FETCH_WORKERS = int(os.getenv("REDDIT_FETCH_WORKERS", 4))
+
+# Hot/rising listings can't be asked for "newer than", so the per-subreddit
+# created_utc watermark is applied as a cutoff before lookups and scoring.
+# The lookback still admits older posts that only now crossed the score bar.
+WATERMARK_LOOKBACK = int(os.getenv("REDDIT_WATERMARK_LOOKBACK", 6 * 3600))
+
+# Comment expansion costs one extra request per post, so it is budgeted:
+# only posts at or above the score / num_comments percentile are expanded,
+# highest score first, until the per-run budget is spent.
+COMMENTS_ENABLED = os.getenv("REDDIT_COMMENTS_ENABLED", "true").lower() == "true"
+COMMENT_BUDGET = int(os.getenv("REDDIT_COMMENT_BUDGET", 20))
+COMMENT_PERCENTILE = float(os.getenv("REDDIT_COMMENT_PERCENTILE", 75))
+COMMENT_WORKERS = int(os.getenv("REDDIT_COMMENT_WORKERS", 4))
+TOP_COMMENTS = 5
+
+def _percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    index = max(int(round(pct / 100 * len(ordered))) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
 
 class RedditAPI(BaseAPI):
+    def fetch_listing(self, subreddit_name, listing):
+        """Materialise one subreddit listing, one request (runs on a worker thread)."""
+        with timed("reddit.fetch_listing") as stage, reddit_client() as reddit:
+            subreddit = reddit.subreddit(subreddit_name)
+            limiter.acquire()
+            posts = list(getattr(subreddit, listing)(limit=LISTING_LIMIT))
+            stage.add_items(len(posts))
+        return posts
+
+    def fetch_candidate_posts(self, workers=FETCH_WORKERS):
+        """
+        Fetch every subreddit/listing pair concurrently and merge them into one
+        list of (subreddit_name, post) deduplicated by post id, since hot and
+        rising often overlap.
+        """
+        jobs = [(subreddit_name, listing) for subreddit_name in SUBREDDITS for listing in LISTINGS]
+        candidates = []
+        seen_ids = set()
+
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+            for (subreddit_name, _), listing_posts in zip(jobs, pool.map(lambda job: self.fetch_listing(*job), jobs)):
+                for post in listing_posts:
+                    if post.id in seen_ids:
+                        continue
+                    seen_ids.add(post.id)
+                    candidates.append((subreddit_name, post))
+
+        return candidates
+
+    def get_created_cutoffs(self):
+        """Per-subreddit created_utc cutoff: the market window or watermark minus lookback."""
+        window_start = self.get_market_window_start().timestamp()
+        watermarks = get_watermarks("reddit", SUBREDDITS)
+        return {
+            subreddit_name: max(window_start, watermarks.get(subreddit_name, 0) - WATERMARK_LOOKBACK)
+            for subreddit_name in SUBREDDITS
+        }
+
+    def advance_watermarks(self, posts):
+        """Record the newest created_utc ingested per subreddit."""
+        newest = {}
+        for reddit_data in posts:
+            subreddit_name = reddit_data["subreddit"]
+            newest[subreddit_name] = max(newest.get(subreddit_name, 0), reddit_data["created_utc"])
+        for subreddit_name, created_utc in newest.items():
+            update_watermark("reddit", subreddit_name, created_utc)
+
+    def filter_new_posts(self, candidates):
+        """Drop posts already stored, using a single $in lookup on post_id."""
+        post_ids = [post.id for post in candidates]
+        if not post_ids:
+            return []
+
+        existing = {
+            doc["post_id"] for doc in dbConnection.reddit_collection.find({"post_id": {"$in": post_ids}}, {"post_id": 1, "_id": 0})
+        }
+        return [post for post in candidates if post.id not in existing]
+
+    def select_posts_for_comments(self, selected, budget=COMMENT_BUDGET, percentile=COMMENT_PERCENTILE):
+        """
+        Pick which posts get their comments expanded: those at or above the
+        score or num_comments percentile, highest score first, capped at budget.
+        """
+        if not selected or budget <= 0:
+            return []
+
+        score_cutoff = _percentile([post.score for post, _ in selected], percentile)
+        comments_cutoff = _percentile([post.num_comments for post, _ in selected], percentile)
+
+        eligible = [
+            (post, reddit_data) for post, reddit_data in selected
+            if post.score >= score_cutoff or post.num_comments >= comments_cutoff
+        ]
+        eligible.sort(key=lambda item: item[0].score, reverse=True)
+        return eligible[:budget]
+
+    def fetch_top_comments(self, post):
+        """
+        One request: load the post's comment forest without expanding "more"
+        stubs. The post is re-bound to this worker's client, since the one that
+        listed it may be busy on another thread.
+        """
+        with timed("reddit.fetch_comments") as stage, reddit_client() as reddit:
+            submission = reddit.submission(id=post.id)
+            limiter.acquire()
+            submission.comments.replace_more(limit=0)
+            comments = [comment.body for comment in submission.comments.list()[:TOP_COMMENTS]]
+            stage.add_items(len(comments))
+        return comments
+
+    def collect_top_comments(self, selected):
+        """
+        Comment stage: fill "top_comments" for the budgeted subset of posts,
+        fetching concurrently. Posts left out keep an empty list.
+        """
+        if not COMMENTS_ENABLED:
+            return
+
+        chosen = self.select_posts_for_comments(selected)
+        if not chosen:
+            return
+
+        with ThreadPoolExecutor(max_workers=max(COMMENT_WORKERS, 1)) as pool:
+            futures = {pool.submit(self.fetch_top_comments, post): reddit_data for post, reddit_data in chosen}
+            for future, reddit_data in futures.items():
+                try:
+                    reddit_data["top_comments"] = future.result()
+                except Exception as e:
+                    print(f"⚠️ Failed to fetch comments: {e}")
+
+        print(f"💬 Expanded comments for {len(chosen)}/{len(selected)} Reddit posts")
+
     def fetch_reddit_posts(self):
         posts = []
-        window_start = self.get_market_window_start().timestamp()
+        selected = []
+        cutoffs = self.get_created_cutoffs()
+        subreddit_of = {}
 
-        for subreddit_name in SUBREDDITS:
-            subreddit = reddit.subreddit(subreddit_name)
+        candidates = []
+        for subreddit_name, post in self.fetch_candidate_posts():
+            if post.score >= 50 and post.created_utc >= cutoffs[subreddit_name]:
+                subreddit_of[post.id] = subreddit_name
+                candidates.append(post)
+
+        self.check_cancelled("scoring")
+        # Buffer the posts that mention a tracked stock, then score them in one batch
+        matched = []
+        for post in self.filter_new_posts(candidates):
+            text = f"{post.title} {post.selftext}"
+            mentions = self.extract_stock_mentions(text)
+            if mentions:
+                matched.append((post, text, mentions))
+
+        texts = [text for _, text, _ in matched]
+        sentiments = self.analyze_sentiment_many(texts)
+        impacts = self.calculate_expected_impact_many(texts, sentiments)
+
+        for (post, _, mentions), sentiment, expected_impact in zip(matched, sentiments, impacts):
+            reddit_data = {
+                "post_id": post.id,
+                "subreddit": subreddit_of[post.id],
+                **self.stock_fields(mentions),
+                "title": post.title,
+                "author": str(post.author),
+                "upvotes": post.score,
+                "num_comments": post.num_comments,
+                "created_utc": post.created_utc,
+                "url": post.url,
+                "selftext": post.selftext[:500] if post.is_self else None,
+                "flair": post.link_flair_text if post.link_flair_text else None,
+                "top_comments": [],
+                "timestamp": clock.utcnow(),
+                "sentiment": sentiment,
+                "expected_impact": expected_impact
+            }
+            posts.append(reddit_data)
+            selected.append((post, reddit_data))
+
+        self.check_cancelled("comments")
+        self.collect_top_comments(selected)
 
-            for post in itertools.chain(subreddit.hot(limit=50), subreddit.rising(limit=50)):
-                if post.score < 50:
-                    continue
-
-                if post.created_utc < window_start:
-                    continue
-
-                if reddit_collection.find_one({"post_id": post.id}):
-                    continue
-
-                text = f"{post.title} {post.selftext}"
-                stock = self.get_tracked_stock(text)
-                if not stock:
-                    continue
-
-                post.comments.replace_more(limit=0)
-                top_comments = [comment.body for comment in post.comments.list()[:5]]
-
-                sentiment = self.analyze_sentiment(text)
-                expected_impact = self.calculate_expected_impact(text, sentiment)
-
-                reddit_data = {
-                    "post_id": post.id,
-                    "stock": stock,
-                    "title": post.title,
-                    "author": str(post.author),
-                    "upvotes": post.score,
-                    "num_comments": post.num_comments,
-                    "url": post.url,
-                    "selftext": post.selftext[:500] if post.is_self else None,
-                    "flair": post.link_flair_text if post.link_flair_text else None,
-                    "top_comments": top_comments,
-                    "timestamp": datetime.utcnow(),
-                    "sentiment": sentiment,
-                    "expected_impact": expected_impact
-                }
-                posts.append(reddit_data)
-
-        if posts:
-            reddit_collection.insert_many(posts)
-            print(f"✅ Inserted {len(posts)} filtered Reddit posts into MongoDB!")
+        self.check_cancelled("storing")
+        inserted = dbConnection.insert_many_new(dbConnection.reddit_collection, prepare_documents(posts))
+        if inserted:
+            print(f"✅ Inserted {len(inserted)} filtered Reddit posts into MongoDB!")
+            record_new_documents(dbConnection.reddit_collection, inserted)
+            publish_documents(inserted, "reddit")
+            self.advance_watermarks(inserted)
+        return len(inserted)
 
 if __name__ == "__main__":
     reddit_api = RedditAPI()
@@ -1,39 +1,104 @@
 # DB/dbConnection.py
 import os
+import threading
 from pymongo import MongoClient
+from pymongo.errors import BulkWriteError
 from dotenv import load_dotenv
+from utils.metrics import timed
 
 # Load environment variables
 load_dotenv()
 
 MONGO_URI = os.getenv("MONGO_URI")
 
-if not MONGO_URI:
-    raise ValueError("MONGO_URI is not set in the .env file")
+# Pool and timeout settings for the single shared client
+MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 20))
+MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", 0))
+MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", 300000))
+CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", 5000))
+SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 10000))
+SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", 30000))
 
-# Connect to MongoDB
-client = MongoClient(MONGO_URI)
+DATABASES = {
+    "sentiment_db": "sentimentData",
+    "trading_db": "tradingData",
+}
 
-# Access Databases
-sentiment_db = client["sentimentData"]
-trading_db = client["tradingData"]
+# Module-level collection handles, resolved on first access (see __getattr__)
+COLLECTIONS = {
+    # Collections in sentimentData
+    "reddit_collection": ("sentimentData", "reddit_posts"),
+    "news_collection": ("sentimentData", "news_articles"),
+    "X_collection": ("sentimentData", "X_posts"),
+    "watermark_collection": ("sentimentData", "ingestion_watermarks"),
+    "summary_collection": ("sentimentData", "ticker_sentiment_summary"),
 
-# Collections in sentimentData
-reddit_collection = sentiment_db["reddit_posts"]
-news_collection = sentiment_db["news_articles"]
-X_collection = sentiment_db["X_posts"]
+    # Collections in tradingData
+    "trades_collection": ("tradingData", "executed_trades"),
+    "stock_data_collection": ("tradingData", "stock_data"),
+    "account_data_collection": ("tradingData", "account_info"),
+    "portfolio_collection": ("tradingData", "portfolio"),
+    "trade_decision_collection": ("tradingData", "trade_decisions"),
+    "sentiment_collection": ("tradingData", "sentiment_data"),
+}
 
-# Collections in tradingData
-trades_collection = trading_db["executed_trades"]
-stock_data_collection = trading_db["stock_data"]
-account_data_collection = trading_db["account_info"]
-portfolio_collection = trading_db["portfolio"]
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """
+    The one MongoClient for the process. Created on first use and kept in module
+    state, so warm Lambda invocations reuse its pool instead of reconnecting.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                if not MONGO_URI:
+                    raise ValueError("MONGO_URI is not set in the .env file")
+                _client = MongoClient(
+                    MONGO_URI,
+                    maxPoolSize=MAX_POOL_SIZE,
+                    minPoolSize=MIN_POOL_SIZE,
+                    maxIdleTimeMS=MAX_IDLE_TIME_MS,
+                    connectTimeoutMS=CONNECT_TIMEOUT_MS,
+                    serverSelectionTimeoutMS=SERVER_SELECTION_TIMEOUT_MS,
+                    socketTimeoutMS=SOCKET_TIMEOUT_MS
+                )
+    return _client
 
 def get_collection(db_name, collection_name):
     """Fetch a collection dynamically based on the database name."""
-    if db_name == "sentimentData":
-        return sentiment_db[collection_name]
-    elif db_name == "tradingData":
-        return trading_db[collection_name]
-    else:
+    if db_name not in DATABASES.values():
         raise ValueError("Invalid database name!")
+    return get_client()[db_name][collection_name]
+
+def insert_many_new(collection, documents):
+    """
+    Unordered insert_many that treats duplicate-key errors (unique indexes, see
+    DB/indexes.py) as "already stored". Returns the documents actually written.
+    """
+    if not documents:
+        return []
+    with timed(f"mongo.insert.{collection.name}") as stage:
+        try:
+            collection.insert_many(documents, ordered=False)
+            inserted = documents
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if any(error.get("code") != 11000 for error in errors):
+                raise
+            duplicates = {error["index"] for error in errors}
+            inserted = [doc for index, doc in enumerate(documents) if index not in duplicates]
+        stage.add_items(len(inserted))
+    return inserted
+
+def __getattr__(name):
+    """Lazily resolve client, sentiment_db, trading_db and the named collections."""
+    if name == "client":
+        return get_client()
+    if name in DATABASES:
+        return get_client()[DATABASES[name]]
+    if name in COLLECTIONS:
+        return get_collection(*COLLECTIONS[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,156 @@
+# DB/indexes.py
+import logging
+import sys
+import threading
+from datetime import datetime
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+from DB.dbConnection import get_collection
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Indexes backing the hot queries, per (database, collection).
+# Unique url/post_id indexes make duplicate inserts fail instead of silently piling up.
+INDEXES = {
+    ("sentimentData", "news_articles"): [
+        IndexModel([("url", ASCENDING)], name="url_unique", unique=True,
+                   partialFilterExpression={"url": {"$type": "string"}}),
+        IndexModel([("title", ASCENDING)], name="title"),
+        IndexModel([("timestamp", DESCENDING)], name="timestamp"),
+        IndexModel([("stock", ASCENDING), ("timestamp", DESCENDING)], name="stock_timestamp"),
+        IndexModel([("stocks", ASCENDING), ("timestamp", DESCENDING)], name="stocks_timestamp"),
+        IndexModel([("summarized", ASCENDING)], name="summary_pending",
+                   partialFilterExpression={"summarized": False}),
+    ],
+    ("sentimentData", "reddit_posts"): [
+        IndexModel([("post_id", ASCENDING)], name="post_id_unique", unique=True),
+        IndexModel([("timestamp", DESCENDING)], name="timestamp"),
+        IndexModel([("stock", ASCENDING), ("timestamp", DESCENDING)], name="stock_timestamp"),
+        IndexModel([("stocks", ASCENDING), ("timestamp", DESCENDING)], name="stocks_timestamp"),
+        IndexModel([("summarized", ASCENDING)], name="summary_pending",
+                   partialFilterExpression={"summarized": False}),
+    ],
+    ("sentimentData", "ingestion_watermarks"): [
+        IndexModel([("source", ASCENDING), ("query", ASCENDING)], name="source_query_unique", unique=True),
+    ],
+    ("sentimentData", "ticker_sentiment_summary"): [
+        IndexModel([("stock", ASCENDING), ("bucket", ASCENDING)], name="stock_bucket_unique", unique=True),
+        IndexModel([("bucket", ASCENDING)], name="bucket"),
+    ],
+    ("tradingData", "stock_data"): [
+        IndexModel([("symbol", ASCENDING), ("timestamp", DESCENDING)], name="symbol_timestamp"),
+    ],
+    ("tradingData", "executed_trades"): [
+        IndexModel([("symbol", ASCENDING), ("created_at", DESCENDING)], name="symbol_created_at"),
+        IndexModel([("order_id", ASCENDING)], name="order_id_unique", unique=True,
+                   partialFilterExpression={"order_id": {"$type": "string"}}),
+    ],
+    ("tradingData", "trade_decisions"): [
+        IndexModel([("stock", ASCENDING), ("timestamp", DESCENDING)], name="stock_timestamp"),
+        IndexModel([("run_id", ASCENDING), ("stock", ASCENDING), ("kind", ASCENDING)], name="run_stock_kind_unique",
+                   unique=True, partialFilterExpression={"run_id": {"$type": "string"}}),
+    ],
+}
+
+# The queries the pipeline actually runs, as (database, collection, label, cursor factory).
+# check_indexes() explains each one and flags any plan that falls back to a COLLSCAN.
+KNOWN_QUERIES = [
+    ("sentimentData", "news_articles", "dedup by url/title",
+     lambda c: c.find({"$or": [{"url": {"$in": ["x"]}}, {"title": {"$in": ["x"]}}]}, {"url": 1, "title": 1})),
+    ("sentimentData", "news_articles", "latest by timestamp",
+     lambda c: c.find({}).sort("timestamp", DESCENDING).limit(5)),
+    ("sentimentData", "news_articles", "ticker window",
+     lambda c: c.find({"stocks": "TSLA"}).sort("timestamp", DESCENDING)),
+    ("sentimentData", "reddit_posts", "dedup by post_id",
+     lambda c: c.find({"post_id": {"$in": ["x"]}}, {"post_id": 1})),
+    ("sentimentData", "reddit_posts", "latest by timestamp",
+     lambda c: c.find({}).sort("timestamp", DESCENDING).limit(5)),
+    ("sentimentData", "reddit_posts", "ticker window",
+     lambda c: c.find({"stocks": "TSLA"}).sort("timestamp", DESCENDING)),
+    ("sentimentData", "news_articles", "unsummarized documents",
+     lambda c: c.find({"summarized": False})),
+    ("sentimentData", "reddit_posts", "unsummarized documents",
+     lambda c: c.find({"summarized": False})),
+    ("sentimentData", "ingestion_watermarks", "watermark lookup",
+     lambda c: c.find({"source": "reddit", "query": {"$in": ["stocks"]}})),
+    ("sentimentData", "ticker_sentiment_summary", "window buckets",
+     lambda c: c.find({"bucket": {"$gte": datetime.utcnow()}})),
+    ("tradingData", "executed_trades", "order update by order_id",
+     lambda c: c.find({"order_id": "x"})),
+    ("tradingData", "trade_decisions", "run entry upsert",
+     lambda c: c.find({"run_id": "x", "stock": "TSLA", "kind": "decision"})),
+    ("tradingData", "stock_data", "quotes by symbol",
+     lambda c: c.find({"symbol": "TSLA"}).sort("timestamp", DESCENDING).limit(1)),
+]
+
+_ensured = False
+_ensure_lock = threading.Lock()
+
+def ensure_indexes(force=False):
+    """
+    Create every declared index. create_indexes is idempotent, and this only
+    talks to Mongo once per process unless force=True. Indexes are built one
+    at a time, so one that fails (e.g. a unique index blocked by existing
+    duplicates) doesn't stop the others on the same collection.
+    Returns the failures as a list of (collection, index name, error).
+    """
+    global _ensured
+    with _ensure_lock:
+        if _ensured and not force:
+            return []
+        failures = []
+        for (db_name, collection_name), indexes in INDEXES.items():
+            collection = get_collection(db_name, collection_name)
+            for index in indexes:
+                name = index.document["name"]
+                try:
+                    collection.create_indexes([index])
+                except OperationFailure as e:
+                    failures.append((f"{db_name}.{collection_name}", name, str(e)))
+                    hint = " (duplicate keys in existing data; dedupe before it can be built)" if e.code == 11000 else ""
+                    logger.warning(f"⚠️ Could not build index {name} on {db_name}.{collection_name}{hint}: {e}")
+        _ensured = True
+        if failures:
+            logger.warning(f"⚠️ MongoDB indexes ensured with {len(failures)} failure(s): {[name for _, name, _ in failures]}")
+        else:
+            logger.info("🗂️ MongoDB indexes ensured.")
+        return failures
+
+def _stages(plan):
+    """Every stage name in an explain() plan tree."""
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from _stages(item)
+
+def check_indexes():
+    """
+    Explain each known query and report the ones whose winning plan scans the
+    whole collection. Returns a list of {"collection", "query", "stages", "collscan"}.
+    """
+    report = []
+    for db_name, collection_name, label, build_query in KNOWN_QUERIES:
+        explain = build_query(get_collection(db_name, collection_name)).explain()
+        stages = list(_stages(explain.get("queryPlanner", {}).get("winningPlan", {})))
+        report.append({
+            "collection": f"{db_name}.{collection_name}",
+            "query": label,
+            "stages": stages,
+            "collscan": "COLLSCAN" in stages
+        })
+    return report
+
+if __name__ == "__main__":
+    if "--check" in sys.argv:
+        results = check_indexes()
+        for result in results:
+            status = "❌ COLLSCAN" if result["collscan"] else "✅"
+            print(f"{status} {result['collection']} — {result['query']}: {' > '.join(result['stages'])}")
+        sys.exit(1 if any(result["collscan"] for result in results) else 0)
+
+    sys.exit(1 if ensure_indexes() else 0)
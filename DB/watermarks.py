@@ -0,0 +1,34 @@
+# DB/watermarks.py
+import os
+from datetime import datetime
+from DB import dbConnection
+
+# dbConnection.watermark_collection holds one document per (source, query) with
+# the newest item already ingested: NewsAPI publishedAt (ISO string), Reddit
+# created_utc (epoch seconds), ...
+
+WATERMARKS_ENABLED = os.getenv("INGESTION_WATERMARKS", "true").lower() == "true"
+
+def get_watermark(source, query):
+    """Return the stored watermark for a source/query, or None if there isn't one."""
+    if not WATERMARKS_ENABLED:
+        return None
+    doc = dbConnection.watermark_collection.find_one({"source": source, "query": query})
+    return doc["value"] if doc else None
+
+def get_watermarks(source, queries):
+    """Watermarks for several queries of one source in a single lookup: {query: value}."""
+    if not WATERMARKS_ENABLED:
+        return {}
+    docs = dbConnection.watermark_collection.find({"source": source, "query": {"$in": list(queries)}})
+    return {doc["query"]: doc["value"] for doc in docs}
+
+def update_watermark(source, query, value):
+    """Advance the watermark; $max means it never moves backwards."""
+    if not WATERMARKS_ENABLED or value is None:
+        return
+    dbConnection.watermark_collection.update_one(
+        {"source": source, "query": query},
+        {"$max": {"value": value}, "$set": {"updated_at": datetime.utcnow()}},
+        upsert=True
+    )
@@ -1,11 +1,33 @@
+import threading
 from utils.sentiment import SentimentAnalyzer
+from utils.tickerMatcher import TickerMatcher, load_universe, rank_mentions
 from datetime import datetime, timedelta
+from utils import clock
+
+class IngestionCancelled(Exception):
+    """Raised at a stage boundary once the run that started the fetch has given up on it."""
 
 class BaseAPI:
     TRACKED_STOCKS = ["TSLA", "NVDA", "META", "AMZN", "AAPL", "GME", "AMC", "PLTR", "MSFT", "GOOGL", "ARKK", "SPY"]
 
-    def __init__(self):
+    # Compiled once per process and shared by every source
+    _ticker_matcher = None
+
+    def __init__(self, cancel=None):
         self.sentiment_analyzer = SentimentAnalyzer()
+        # Set by run_ingestion when the source times out; checked between stages
+        self.cancel = cancel or threading.Event()
+
+    def check_cancelled(self, stage):
+        """Stop before stage if the fetch was cancelled, so a timed-out run stores nothing more."""
+        if self.cancel.is_set():
+            raise IngestionCancelled(f"{type(self).__name__} cancelled before {stage}")
+
+    @property
+    def ticker_matcher(self):
+        if BaseAPI._ticker_matcher is None:
+            BaseAPI._ticker_matcher = TickerMatcher(load_universe(self.TRACKED_STOCKS))
+        return BaseAPI._ticker_matcher
 
     def analyze_sentiment(self, text):
         """Use shared sentiment analysis logic."""
@@ -15,30 +37,59 @@ class BaseAPI:
         """Default expected impact calculation (overridden in child classes if needed)."""
         return self.sentiment_analyzer.calculate_expected_impact(text, sentiment, source)
 
+    def analyze_sentiment_many(self, texts):
+        """Batch form of analyze_sentiment, one result per text."""
+        return self.sentiment_analyzer.analyze_many(texts)
+
+    def calculate_expected_impact_many(self, texts, sentiments, sources=None):
+        """Batch form of calculate_expected_impact."""
+        return self.sentiment_analyzer.calculate_expected_impact_many(texts, sentiments, sources)
+
     def filter_stock_mentions(self, text):
         """Check if text mentions any tracked stock ticker."""
-        return any(stock in text for stock in self.TRACKED_STOCKS)
+        return self.ticker_matcher.contains(text)
 
     def get_tracked_stock(self, text):
         """
-        Identify the first stock mentioned in the given text.
+        Identify the first stock mentioned in the given text, in TRACKED_STOCKS order.
         Returns the stock ticker if found, otherwise None.
         """
-        for stock in self.TRACKED_STOCKS:
-            if stock in text:
-                return stock  # ✅ Return the first matched stock
-        return None  # ❌ No tracked stock found
-    
+        return self.ticker_matcher.first(text)
+
+    def extract_stock_mentions(self, text):
+        """
+        Every tracked stock mentioned in the text, with counts and character offsets:
+        {ticker: {"count": n, "positions": [...]}}.
+        """
+        return self.ticker_matcher.extract(text)
+
+    def stock_fields(self, mentions):
+        """
+        Document fields for the mentioned tickers: "stock" is the most-mentioned
+        one, "stocks" lists all of them (most mentioned first) so one document
+        can feed signals for several tickers.
+        """
+        stocks = rank_mentions(mentions)
+        return {
+            "stock": stocks[0],
+            "stocks": stocks,
+            "mention_counts": {symbol: mentions[symbol]["count"] for symbol in stocks}
+        }
+
     def get_market_window_start(self):
         """
         Returns the datetime to use as the start of the sentiment fetch window.
         - Monday → past 3 days (Fri + weekend)
         - Tues–Fri → past 24 hours
         """
-        now = datetime.utcnow()
-        weekday = now.weekday()
+        return market_window_start()
+
+def market_window_start(now=None):
+    """Start of the sentiment window ending at now (UTC); see BaseAPI.get_market_window_start."""
+    now = now or clock.utcnow()
+    weekday = now.weekday()
 
-        if weekday == 0:
-            return now - timedelta(days=3)
-        else:
-            return now - timedelta(days=1)
+    if weekday == 0:
+        return now - timedelta(days=3)
+    else:
+        return now - timedelta(days=1)
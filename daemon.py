@@ -0,0 +1,127 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import argparse
+import logging
+import signal
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Long-running alternative to main.lambda_handler: one process keeps the Mongo,
+# praw and Alpaca clients, the sentiment cache and the ticker matcher warm and
+# runs each stage on its own cadence (seconds).
+REDDIT_INTERVAL = float(os.getenv("DAEMON_REDDIT_INTERVAL", 120))
+NEWS_INTERVAL = float(os.getenv("DAEMON_NEWS_INTERVAL", 300))
+TRADING_INTERVAL = float(os.getenv("DAEMON_TRADING_INTERVAL", 900))
+METRICS_INTERVAL = float(os.getenv("DAEMON_METRICS_INTERVAL", 60))
+# Jitter as a fraction of each interval, so runs drift apart instead of bunching
+JITTER = float(os.getenv("DAEMON_JITTER", 0.1))
+# Trading (scheduled and event-driven) only runs in the regular session, first at the open
+TRADING_MARKET_HOURS = os.getenv("DAEMON_TRADING_MARKET_HOURS", "true").lower() == "true"
+SHUTDOWN_TIMEOUT = float(os.getenv("DAEMON_SHUTDOWN_TIMEOUT", 60))
+# Also re-evaluate tickers as soon as new sentiment for them is stored (utils/tradeEvents.py)
+EVENT_TRADING = os.getenv("DAEMON_EVENT_TRADING", "false").lower() == "true"
+# Keep a streaming quote book for the tracked universe (APIs/alpacaStream.py),
+# so trading reads quotes from memory instead of REST
+MARKET_STREAM = os.getenv("DAEMON_MARKET_STREAM", "false").lower() == "true"
+# Follow order fills/cancels over trade_updates (utils/orderTracker.py)
+ORDER_TRACKING = os.getenv("DAEMON_ORDER_TRACKING", "false").lower() == "true"
+
+def ingestion_job(source):
+    """Run a single registered ingestion source."""
+    def run():
+        from utils.ingestion import SOURCES, run_ingestion
+        return run_ingestion({source: SOURCES[source]})
+    return run
+
+def trading_job():
+    from utils.tradingModel import execute_trades
+    execute_trades()
+
+def metrics_job():
+    from utils.metrics import metrics
+    metrics.flush(reset=True)
+
+def build_jobs():
+    from utils.scheduler import Job
+
+    return [
+        Job("reddit", ingestion_job("reddit"), REDDIT_INTERVAL, JITTER * REDDIT_INTERVAL),
+        Job("news", ingestion_job("news"), NEWS_INTERVAL, JITTER * NEWS_INTERVAL),
+        Job("trading", trading_job, TRADING_INTERVAL, JITTER * TRADING_INTERVAL, market_hours=TRADING_MARKET_HOURS),
+        Job("metrics", metrics_job, METRICS_INTERVAL),
+    ]
+
+def start_market_stream():
+    from APIs.alpacaStream import start_market_stream
+    from baseAPI import BaseAPI
+    from utils.tickerMatcher import load_universe
+    return start_market_stream(load_universe(BaseAPI.TRACKED_STOCKS))
+
+def run_daemon(jobs=None, once=False, event_trading=EVENT_TRADING, market_stream=MARKET_STREAM,
+               order_tracking=ORDER_TRACKING):
+    """
+    Run the scheduler until SIGTERM/SIGINT, then let running jobs finish (up to
+    DAEMON_SHUTDOWN_TIMEOUT). once=True runs every job a single time and exits.
+    event_trading also starts the event-driven trading worker, market_stream
+    the streaming quote book and order_tracking the trade_updates consumer.
+    """
+    from DB.indexes import ensure_indexes
+    from utils.scheduler import Scheduler
+
+    jobs = jobs or build_jobs()
+    ensure_indexes()
+
+    if once:
+        for job in jobs:
+            logger.info(f"▶️ Running {job.name} once")
+            job.func()
+        return
+
+    scheduler = Scheduler(jobs)
+    stream = start_market_stream() if market_stream else None
+    orders = None
+    if order_tracking:
+        from utils.orderTracker import start_order_tracking
+        orders = start_order_tracking()
+    events = None
+    if event_trading:
+        from utils.tradeEvents import start_event_trading
+        events = start_event_trading(market_hours=TRADING_MARKET_HOURS)
+
+    def handle_signal(signum, frame):
+        logger.info(f"🛑 Received {signal.Signals(signum).name}, shutting down...")
+        scheduler.stop()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    scheduler.run()
+    finished = scheduler.shutdown(SHUTDOWN_TIMEOUT)
+    if events:
+        events.stop(SHUTDOWN_TIMEOUT)
+    if stream:
+        stream.stop(SHUTDOWN_TIMEOUT)
+    if orders:
+        # After the scheduler, so fills for orders placed by the last run are written
+        orders.stop(SHUTDOWN_TIMEOUT)
+    metrics_job()
+    logger.info(f"✅ Daemon stopped ({'clean' if finished else 'jobs still running'}): {scheduler.stats()}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run ingestion and trading on intraday cadences.")
+    parser.add_argument("--once", action="store_true", help="run every job once and exit")
+    parser.add_argument("--jobs", nargs="*", help="only run these jobs (reddit, news, trading, metrics)")
+    args = parser.parse_args()
+
+    # CASSETTE_MODE=replay runs the daemon against recorded HTTP (utils/cassette.py)
+    from utils.cassette import install_from_env
+    install_from_env()
+
+    selected = [job for job in build_jobs() if not args.jobs or job.name in args.jobs]
+    run_daemon(selected, once=args.once)
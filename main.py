@@ -2,21 +2,31 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from APIs.newsAPI import NewsAPI
-from APIs.redditAPI import RedditAPI
-from utils.tradingModel import execute_trades  # Import trading function
+# Stage modules are imported inside the functions that run them, so importing
+# this handler stays cheap and a cold start only pays for the stages it runs.
+# Python caches the modules (and their clients) for warm invocations.
 
 def run_sentiment_analysis():
     """
     Fetches financial news, Reddit posts, and tweets and stores them in MongoDB.
+    All sources run concurrently; returns the per-source ingestion summary.
     """
-    news_api = NewsAPI()
-    reddit_api = RedditAPI()
+    from DB.indexes import ensure_indexes
+    from utils.ingestion import run_ingestion
 
-    news_api.fetch_financial_news()
-    reddit_api.fetch_reddit_posts()
+    ensure_indexes()
+    return run_ingestion()
+
+def execute_trades(run_id=None):
+    """Run the trading model over the stored sentiment data."""
+    from utils.tradingModel import execute_trades as run_trading_model
+    return run_trading_model(run_id=run_id)
 
 if __name__ == "__main__":
+    # CASSETTE_MODE=record|replay runs against a recorded HTTP cassette (utils/cassette.py)
+    from utils.cassette import install_from_env
+    install_from_env()
+
     print("🚀 Running sentiment analysis...")
     run_sentiment_analysis()
 
@@ -24,14 +34,25 @@ if __name__ == "__main__":
     execute_trades()
 
 def lambda_handler(event=None, context=None):
-    print(f"🟢 Lambda invoked with event: {event}")
-
-    print("🚀 Running sentiment analysis...")
-    run_sentiment_analysis()
-
-    print("📈 Running trading model based on sentiment data...")
-    execute_trades()
+    from utils.metrics import metrics
 
+    print(f"🟢 Lambda invoked with event: {event}")
+    # Warm invocations reuse the module, so start every run from empty totals
+    metrics.reset()
+
+    try:
+        print("🚀 Running sentiment analysis...")
+        with metrics.timed("ingestion"):
+            ingestion_summary = run_sentiment_analysis()
+
+        print("📈 Running trading model based on sentiment data...")
+        with metrics.timed("trading"):
+            # Lambda retries an invocation with the same request id, so its
+            # orders get the same client_order_ids and can't be placed twice
+            execute_trades(run_id=getattr(context, "aws_request_id", None))
+    finally:
+        # Flushed even when a stage raises, so failed runs still report timings
+        stages = metrics.flush()
     print("✅ Lambda execution complete.")
-    return {"status": "success"}
+    return {"status": "success", "ingestion": ingestion_summary, "stages": stages}
 
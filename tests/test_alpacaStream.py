@@ -0,0 +1,87 @@
+import time
+import unittest
+from unittest import mock
+
+from APIs import alpacaStream
+from APIs.alpacaStream import MarketDataStream, QuoteBook, StreamClient, TradeUpdatesStream
+from utils.streamReplay import ReplayServer, TradeUpdatesReplayHandler
+
+def quote(symbol, bid):
+    return {"T": "q", "S": symbol, "bp": bid, "ap": bid + 0.1, "bs": 1, "as": 1, "t": "2024-05-01T14:30:00Z"}
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+class MarketDataStreamTest(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(alpacaStream, "RECONNECT_BASE", 0.05)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.stream = None
+
+    def tearDown(self):
+        if self.stream:
+            self.stream.stop(5)
+        self.server.stop()
+
+    def start(self, messages, symbols, **kwargs):
+        self.server = ReplayServer(messages, **kwargs).start()
+        self.book = QuoteBook()
+        self.stream = MarketDataStream(symbols, self.book, self.server.url, api_key="key", api_secret="secret")
+        self.stream.start()
+
+    def test_reconnects_and_resubscribes_after_a_drop(self):
+        messages = [quote("AAA", 10), quote("AAA", 11), quote("BBB", 20)]
+        self.start(messages, ["AAA"], interval=0.2, disconnect_after=2)
+
+        self.assertTrue(self.stream.authenticated.wait(5))
+        # Added while connected: must be part of the re-subscribe after the drop
+        self.stream.subscribe(["BBB"])
+
+        self.assertTrue(wait_for(lambda: self.book.stock_info("BBB") is not None))
+        self.assertEqual(self.server.connections, 2)
+        self.assertEqual(self.book.stock_info("AAA")["bid_price"], 11)
+        self.assertEqual(self.book.stock_info("BBB")["bid_price"], 20)
+        # Two messages before the drop, the whole replay after it
+        self.assertEqual(self.stream.messages, 5)
+
+    def test_subscribe_message_covers_every_symbol(self):
+        self.start([], ["BBB", "AAA"])
+        self.stream.subscribe(["CCC", "AAA"])
+        self.assertEqual(self.stream.subscribe_message()["quotes"], ["AAA", "BBB", "CCC"])
+        self.assertEqual(self.stream.subscribe_message({"CCC"})["bars"], ["CCC"])
+
+class TradeUpdatesStreamTest(unittest.TestCase):
+
+    def test_on_connect_runs_once_per_connection(self):
+        patcher = mock.patch.object(alpacaStream, "RECONNECT_BASE", 0.05)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        events = [{"stream": "trade_updates", "data": {"event": "new", "order": {"id": str(i)}}} for i in range(3)]
+        server = ReplayServer(events, disconnect_after=1, handler=TradeUpdatesReplayHandler).start()
+        self.addCleanup(server.stop)
+
+        updates, connects = [], []
+        stream = TradeUpdatesStream(updates.append, server.url, "key", "secret",
+                                    on_connect=lambda: connects.append(len(updates)))
+        stream.start()
+        self.addCleanup(stream.stop, 5)
+
+        self.assertTrue(wait_for(lambda: len(updates) == 4))
+        # Each connect's hook ran before any of that connection's events
+        self.assertEqual(connects, [0, 1])
+
+class StreamClientTest(unittest.TestCase):
+
+    def test_protocol_methods_are_abstract(self):
+        with self.assertRaises(TypeError):
+            StreamClient("ws://localhost", "incomplete")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,25 @@
+import unittest
+
+import requests
+
+from utils.cassette import CassetteMiss, request_key
+
+QUOTES_URL = "https://data.alpaca.markets/v2/stocks/quotes/latest"
+
+class RequestKeyTest(unittest.TestCase):
+
+    def test_symbol_order_does_not_matter(self):
+        self.assertEqual(request_key("GET", f"{QUOTES_URL}?symbols=TSLA,AAPL"),
+                         request_key("GET", f"{QUOTES_URL}?symbols=AAPL,TSLA"))
+
+    def test_ignored_fields_are_left_out(self):
+        self.assertEqual(
+            request_key("POST", "https://paper-api.alpaca.markets/v2/orders", '{"symbol": "AAPL", "client_order_id": "a"}'),
+            request_key("POST", "https://paper-api.alpaca.markets/v2/orders", '{"client_order_id": "b", "symbol": "AAPL"}')
+        )
+
+    def test_miss_is_a_request_exception(self):
+        self.assertTrue(issubclass(CassetteMiss, requests.exceptions.RequestException))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+
+from utils.orderTracker import OrderTracker
+
+def order(order_id, symbol="AAA", status="new"):
+    return {"id": order_id, "symbol": symbol, "side": "buy", "qty": "1", "filled_qty": "0", "status": status}
+
+class OrderTrackerTest(unittest.TestCase):
+
+    def test_resync_closes_orders_missed_while_away(self):
+        tracker = OrderTracker()
+        tracker.track(order("1"))
+        tracker.track(order("2", "BBB"))
+
+        added, closed = tracker.resync(lambda: [order("2", "BBB"), order("3", "CCC")])
+
+        self.assertEqual((added, closed), (1, 1))
+        self.assertEqual(set(tracker.open_orders()), {"2", "3"})
+        self.assertFalse(tracker.has_open_order("AAA"))
+        # A late track() of the closed order doesn't reopen it
+        tracker.track(order("1"))
+        self.assertFalse(tracker.has_open_order("AAA"))
+
+    def test_resync_keeps_orders_tracked_during_the_request(self):
+        tracker = OrderTracker()
+
+        def fetch():
+            # Submitted after Alpaca answered, tracked before the answer is applied
+            tracker.track(order("4", "DDD"))
+            return []
+
+        tracker.resync(fetch)
+        self.assertTrue(tracker.has_open_order("DDD"))
+
+    def test_resync_does_not_reopen_closed_orders(self):
+        tracker = OrderTracker()
+        tracker.apply({"event": "fill", "order": order("5", status="filled")})
+        tracker.resync(lambda: [order("5")])
+        self.assertFalse(tracker.has_open_order("AAA"))
+
+    def test_closed_ids_are_bounded(self):
+        tracker = OrderTracker(max_closed=3)
+        for order_id in "abcde":
+            tracker.apply({"event": "canceled", "order": order(order_id, status="canceled")})
+        self.assertEqual(list(tracker.closed), ["c", "d", "e"])
+
+if __name__ == "__main__":
+    unittest.main()
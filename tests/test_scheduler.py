@@ -0,0 +1,129 @@
+import random
+import threading
+import unittest
+from concurrent.futures import wait
+from datetime import datetime
+
+from utils.scheduler import Job, Scheduler, is_market_open, next_market_open, MARKET_TZ
+
+class FakeClock:
+    """Settable stand-in for time.time."""
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+def market_time(year, month, day, hour, minute):
+    return datetime(year, month, day, hour, minute, tzinfo=MARKET_TZ).timestamp()
+
+class SchedulerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock(1000.0)
+        self.schedulers = []
+
+    def tearDown(self):
+        for scheduler in self.schedulers:
+            scheduler.shutdown(timeout=5)
+
+    def scheduler(self, jobs, **kwargs):
+        kwargs.setdefault("market_open", lambda timestamp: True)
+        scheduler = Scheduler(jobs, clock=self.clock, rng=random.Random(7), **kwargs)
+        self.schedulers.append(scheduler)
+        return scheduler
+
+    def test_overlapping_run_is_skipped(self):
+        release = threading.Event()
+        started = threading.Event()
+
+        def slow():
+            started.set()
+            release.wait(5)
+
+        job = Job("slow", slow, interval=60)
+        scheduler = self.scheduler([job])
+
+        scheduler.tick()
+        self.assertTrue(started.wait(5))
+        self.clock.advance(60)
+        scheduler.tick()
+        self.assertEqual(job.skipped, 1)
+
+        release.set()
+        self.assertTrue(scheduler.shutdown(timeout=5))
+        self.assertEqual(job.runs, 1)
+
+    def test_job_runs_again_once_finished(self):
+        calls = []
+        job = Job("quick", lambda: calls.append(self.clock()), interval=60)
+        scheduler = self.scheduler([job])
+
+        scheduler.tick()
+        wait(list(scheduler.futures), timeout=5)
+        self.clock.advance(60)
+        scheduler.tick()
+        scheduler.shutdown(timeout=5)
+
+        self.assertEqual(calls, [1000.0, 1060.0])
+        self.assertEqual(job.skipped, 0)
+
+    def test_jitter_stays_within_bounds(self):
+        job = Job("jittered", lambda: None, interval=100, jitter=10)
+        scheduler = self.scheduler([job])
+
+        scheduler._schedule(job, self.clock(), first=True)
+        self.assertTrue(1000.0 <= job.next_run <= 1010.0)
+
+        due = set()
+        for _ in range(50):
+            scheduler._schedule(job, self.clock())
+            self.assertTrue(1090.0 <= job.next_run <= 1110.0)
+            due.add(job.next_run)
+        self.assertGreater(len(due), 1)
+
+    def test_jitter_is_capped_at_half_the_interval(self):
+        self.assertEqual(Job("capped", lambda: None, interval=10, jitter=30).jitter, 5)
+
+    def test_market_hours_job_waits_for_the_open(self):
+        calls = []
+        job = Job("trading", lambda: calls.append(True), interval=60, market_hours=True)
+        scheduler = self.scheduler([job], market_open=lambda timestamp: False, next_open=lambda timestamp: 5000.0)
+
+        scheduler.tick()
+        scheduler.shutdown(timeout=5)
+        self.assertEqual(job.next_run, 5000.0)
+        self.assertEqual(calls, [])
+
+    def test_other_jobs_ignore_market_hours(self):
+        job = Job("news", lambda: None, interval=60)
+        scheduler = self.scheduler([job], market_open=lambda timestamp: False, next_open=lambda timestamp: 5000.0)
+
+        scheduler._schedule(job, self.clock())
+        self.assertEqual(job.next_run, 1060.0)
+
+class MarketHoursTest(unittest.TestCase):
+
+    def test_session_bounds(self):
+        # Wednesday 2024-05-01
+        self.assertFalse(is_market_open(market_time(2024, 5, 1, 9, 29)))
+        self.assertTrue(is_market_open(market_time(2024, 5, 1, 9, 30)))
+        self.assertTrue(is_market_open(market_time(2024, 5, 1, 15, 59)))
+        self.assertFalse(is_market_open(market_time(2024, 5, 1, 16, 0)))
+
+    def test_weekend_is_closed(self):
+        self.assertFalse(is_market_open(market_time(2024, 5, 4, 12, 0)))
+
+    def test_next_open_skips_the_weekend(self):
+        # Friday after the close -> Monday 9:30
+        self.assertEqual(next_market_open(market_time(2024, 5, 3, 17, 0)), market_time(2024, 5, 6, 9, 30))
+
+    def test_next_open_same_day_before_the_open(self):
+        self.assertEqual(next_market_open(market_time(2024, 5, 1, 8, 0)), market_time(2024, 5, 1, 9, 30))
+
+if __name__ == "__main__":
+    unittest.main()
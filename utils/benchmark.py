@@ -0,0 +1,391 @@
+import argparse
+import gzip
+import itertools
+import json
+import platform
+import random
+import statistics
+import string
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+# Benchmarks for the hot paths, run against a synthetic (seeded) or recorded
+# corpus. Mongo is replaced by in-process stand-ins (mongomock, plus a bare
+# dedup-only collection for insert_many_new) and Alpaca by a fake client, so
+# nothing needs credentials or the network.
+#
+#   python -m utils.benchmark --size 100000 --save baseline.json
+#   python -m utils.benchmark --baseline baseline.json --threshold 0.15
+
+SEED = 42
+# mongomock checks unique indexes by scanning the collection, so its insert
+# benchmark uses a smaller corpus
+MONGOMOCK_DOCUMENTS = 1000
+UNIVERSE_SIZES = [12, 500, 5000]
+VOCABULARY = (
+    "stock market shares rally surge plunge crash earnings revenue guidance beat miss "
+    "bullish bearish strong weak growth loss profit buy sell hold great terrible good bad "
+    "investors traders analysts upgrade downgrade record high low quarter outlook risk "
+    "the a and of to in on for with this that is was will today week"
+).split()
+
+def synthetic_corpus(size, symbols, seed=SEED):
+    """Deterministic news/reddit-like texts, most mentioning one or two tickers."""
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(size):
+        words = rng.choices(VOCABULARY, k=rng.randint(20, 80))
+        for _ in range(rng.choice([0, 1, 1, 2])):
+            symbol = rng.choice(symbols)
+            words.insert(rng.randrange(len(words) + 1), f"${symbol}" if rng.random() < 0.3 else symbol)
+        texts.append(" ".join(words))
+    return texts
+
+def load_corpus(path, size):
+    """
+    Texts from a JSONL(.gz) file: lines with a "text" field, or stored news/reddit
+    documents (title, description, content, selftext).
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    texts = []
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            text = record.get("text") or " ".join(
+                record.get(field) or "" for field in ("title", "description", "content", "selftext")
+            )
+            if text.strip():
+                texts.append(text)
+            if len(texts) >= size:
+                break
+    return texts
+
+def synthetic_universe(size, seed=SEED):
+    """The tracked stocks followed by random 2-5 letter symbols, size in total."""
+    from baseAPI import BaseAPI
+
+    rng = random.Random(seed)
+    universe = list(BaseAPI.TRACKED_STOCKS[:size])
+    seen = set(universe)
+    while len(universe) < size:
+        symbol = "".join(rng.choices(string.ascii_uppercase, k=rng.randint(2, 5)))
+        if symbol not in seen:
+            seen.add(symbol)
+            universe.append(symbol)
+    return universe
+
+def best_time(func, repeat):
+    """Fastest of repeat runs, in seconds."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+def throughput(n, seconds, unit):
+    return {"value": round(n / seconds, 1), "unit": unit, "higher_is_better": True, "n": n}
+
+def bench_ticker_matching(texts, repeat):
+    """BaseAPI.get_tracked_stock texts/sec for each universe size."""
+    from baseAPI import BaseAPI
+    from utils.tickerMatcher import TickerMatcher
+
+    results = {}
+    api = BaseAPI()
+    try:
+        for size in UNIVERSE_SIZES:
+            BaseAPI._ticker_matcher = TickerMatcher(synthetic_universe(size))
+            seconds = best_time(lambda: [api.get_tracked_stock(text) for text in texts], repeat)
+            results[f"get_tracked_stock[universe={size}]"] = throughput(len(texts), seconds, "texts/s")
+    finally:
+        BaseAPI._ticker_matcher = None
+    return results
+
+def bench_scoring(texts, repeat):
+    """SentimentAnalyzer.analyze and calculate_expected_impact docs/sec, cache bypassed."""
+    from utils.sentiment import SentimentAnalyzer, get_scorers
+
+    get_scorers()  # model load is a one-off cold-start cost, not part of the rate
+    analyzer = SentimentAnalyzer()
+    analyzer.cache = None
+    sentiments = [analyzer.analyze(text) for text in texts]
+
+    analyze_seconds = best_time(lambda: [analyzer.analyze(text) for text in texts], repeat)
+    impact_seconds = best_time(lambda: [
+        analyzer.calculate_expected_impact(text, sentiment, "reuters") for text, sentiment in zip(texts, sentiments)
+    ], repeat)
+    return {
+        "analyze": throughput(len(texts), analyze_seconds, "docs/s"),
+        "calculate_expected_impact": throughput(len(texts), impact_seconds, "docs/s")
+    }
+
+@contextmanager
+def stand_in_mongo():
+    """
+    Point DB.dbConnection at a fresh mongomock client for the duration of the
+    block, then restore the previous client and mongomock's own bulk_write.
+    """
+    try:
+        import mongomock
+    except ImportError as e:
+        raise ImportError("The Mongo benchmarks need mongomock: pip install mongomock") from e
+    from pymongo import InsertOne, UpdateOne
+    from pymongo.errors import BulkWriteError, DuplicateKeyError
+    from DB import dbConnection
+
+    # mongomock's bulk_write predates the arguments newer pymongo operations
+    # pass it; apply the operations the pipeline uses (UpdateOne, InsertOne)
+    # one by one, reporting duplicate keys the way pymongo does.
+    def bulk_write(collection, operations, ordered=True):
+        errors = []
+        for index, operation in enumerate(operations):
+            if not isinstance(operation, (UpdateOne, InsertOne)):
+                raise TypeError(f"stand-in bulk_write only supports UpdateOne and InsertOne, got {operation!r}")
+            try:
+                if isinstance(operation, UpdateOne):
+                    collection.update_one(operation._filter, operation._doc, upsert=operation._upsert)
+                else:
+                    collection.insert_one(operation._doc)
+            except DuplicateKeyError as e:
+                errors.append({"index": index, "code": 11000, "errmsg": str(e)})
+                if ordered:
+                    break
+        if errors:
+            raise BulkWriteError({"writeErrors": errors})
+
+    original_bulk_write = mongomock.Collection.bulk_write
+    previous_client = dbConnection._client
+    mongomock.Collection.bulk_write = bulk_write
+    dbConnection._client = mongomock.MongoClient()
+    try:
+        yield dbConnection
+    finally:
+        mongomock.Collection.bulk_write = original_bulk_write
+        dbConnection._client = previous_client
+
+def _news_documents(texts, symbols, start=0):
+    now = datetime.utcnow()
+    rng = random.Random(SEED)
+    return [{
+        "stock": symbols[index % len(symbols)],
+        "stocks": [symbols[index % len(symbols)]],
+        "title": text[:60],
+        "content": text,
+        "url": f"https://example.com/article/{start + index}",
+        "timestamp": now - timedelta(minutes=rng.randint(0, 300)),
+        "sentiment": {"vader_score": rng.uniform(-1, 1), "textblob_polarity": 0, "textblob_subjectivity": 0},
+        "expected_impact": rng.uniform(0, 5)
+    } for index, text in enumerate(texts)]
+
+class StandInCollection:
+    """
+    Minimal in-process insert target with a unique "url" index, raising the same
+    BulkWriteError shape as pymongo. Benchmarks against it time insert_many_new's
+    own dedup handling only; no real insert path is involved.
+    """
+
+    def __init__(self, name="news_articles"):
+        self.name = name
+        self.urls = set()
+
+    def insert_many(self, documents, ordered=True):
+        from bson import ObjectId
+        from pymongo.errors import BulkWriteError
+
+        errors = []
+        for index, document in enumerate(documents):
+            if document["url"] in self.urls:
+                errors.append({"index": index, "code": 11000, "errmsg": "E11000 duplicate key error"})
+                if ordered:
+                    break
+                continue
+            document.setdefault("_id", ObjectId())
+            self.urls.add(document["url"])
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(documents) - len(errors)})
+
+def bench_mongo_writes(texts, repeat, batch_size=100):
+    """
+    insert_many_new docs/sec, fresh and half duplicates: into StandInCollection
+    ("dedup logic", insert_many_new's own overhead) and into a mongomock
+    collection with the real indexes ("mongomock", the whole insert path on a
+    MONGOMOCK_DOCUMENTS corpus; slower than a mongod, compare it only with itself).
+    """
+    from baseAPI import BaseAPI
+    from DB import dbConnection
+    from DB.indexes import INDEXES
+
+    symbols = BaseAPI.TRACKED_STOCKS
+
+    def run(texts, duplicate_ratio, make_collection):
+        collection = make_collection()
+        existing = _news_documents(texts[:int(len(texts) * duplicate_ratio)], symbols)
+        if existing:
+            collection.insert_many(existing)
+        documents = _news_documents(texts, symbols)
+
+        started = time.perf_counter()
+        for start in range(0, len(documents), batch_size):
+            dbConnection.insert_many_new(collection, documents[start:start + batch_size])
+        return time.perf_counter() - started
+
+    results = {}
+    with stand_in_mongo():
+        def mongomock_collection():
+            collection = dbConnection.news_collection
+            collection.drop()
+            collection.create_indexes(INDEXES[("sentimentData", "news_articles")])
+            return collection
+
+        mongomock_texts = texts[:MONGOMOCK_DOCUMENTS]
+        for label, ratio in (("new", 0), ("50% duplicates", 0.5)):
+            results[f"insert_many_new[dedup logic, {label}]"] = throughput(
+                len(texts), min(run(texts, ratio, StandInCollection) for _ in range(repeat)), "docs/s")
+            results[f"insert_many_new[mongomock, {label}]"] = throughput(
+                len(mongomock_texts), min(run(mongomock_texts, ratio, mongomock_collection) for _ in range(repeat)),
+                "docs/s")
+    return results
+
+class FakeAlpacaClient:
+    """Canned Alpaca responses for the trading path, with an optional per-call delay."""
+
+    class Response:
+        def __init__(self, payload, status_code=200):
+            self.payload = payload
+            self.status_code = status_code
+
+        def json(self):
+            return self.payload
+
+        def raise_for_status(self):
+            pass
+
+    def __init__(self, latency_ms=0):
+        self.latency = latency_ms / 1000
+        self.calls = 0
+        # Orders are submitted from several threads; count() hands out unique ids
+        self.order_ids = itertools.count(1)
+
+    def get(self, url, params=None, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency)
+        if url.endswith("/account"):
+            return self.Response({"cash": "100000", "buying_power": "200000", "equity": "100000"})
+        if url.endswith("/positions"):
+            return self.Response([])
+        symbols = params["symbols"].split(",") if params else [url.split("/stocks/")[1].split("/")[0]]
+        quotes = {symbol: {"bp": 99.5, "ap": 100.5, "bs": 3, "as": 2} for symbol in symbols}
+        return self.Response({"quotes": quotes} if params else {"quote": quotes[symbols[0]]})
+
+    def post(self, url, json=None, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency)
+        return self.Response({"id": str(next(self.order_ids)), "status": "accepted", "filled_avg_price": None,
+                              "submitted_at": datetime.utcnow().isoformat(), **(json or {})})
+
+def bench_execute_trades(texts, repeat, broker_latency_ms=0):
+    """execute_trades wall time per run against a stand-in Mongo and a fake broker."""
+    from APIs import alpacaAPI
+    from baseAPI import BaseAPI
+    from utils.sentimentSummary import rebuild_summary
+    from utils.tradingModel import execute_trades
+
+    previous_client = alpacaAPI._client
+    alpacaAPI._client = FakeAlpacaClient(broker_latency_ms)
+    runs = []
+    try:
+        with stand_in_mongo() as dbConnection:
+            dbConnection.news_collection.insert_many(_news_documents(texts[:2000], BaseAPI.TRACKED_STOCKS))
+            # A full summary, so the run reads it (mongomock can't run the raw aggregation)
+            rebuild_summary()
+            for _ in range(repeat):
+                started = time.perf_counter()
+                execute_trades()
+                runs.append((time.perf_counter() - started) * 1000)
+    finally:
+        alpacaAPI._client = previous_client
+
+    return {
+        f"execute_trades[broker_latency={broker_latency_ms}ms]": {
+            "value": round(statistics.median(runs), 2), "unit": "ms", "higher_is_better": False, "n": repeat
+        }
+    }
+
+BENCHMARKS = {
+    "matching": bench_ticker_matching,
+    "scoring": bench_scoring,
+    "mongo": bench_mongo_writes,
+    "trading": bench_execute_trades,
+}
+
+def run_benchmarks(texts, only=None, repeat=3, score_size=10000):
+    import logging
+    # The pipeline logs every decision and insert; keep that out of the timings
+    logging.disable(logging.INFO)
+
+    results = {}
+    for name, bench in BENCHMARKS.items():
+        if only and name not in only:
+            continue
+        corpus = texts[:score_size] if name == "scoring" else texts
+        started = time.perf_counter()
+        results.update(bench(corpus, repeat))
+        print(f"⏱️ {name} done in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    logging.disable(logging.NOTSET)
+    return {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "corpus_size": len(texts),
+            "repeat": repeat
+        },
+        "results": results
+    }
+
+def compare(report, baseline, threshold):
+    """Results worse than the baseline by more than threshold (a fraction)."""
+    regressions = []
+    for name, result in report["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous or not previous["value"]:
+            continue
+        change = (result["value"] - previous["value"]) / previous["value"]
+        if not result["higher_is_better"]:
+            change = -change
+        if change < -threshold:
+            regressions.append(f"{name}: {previous['value']} -> {result['value']} {result['unit']} ({change:+.1%})")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks for ingestion, matching, scoring and trading.")
+    parser.add_argument("--size", type=int, default=100000, help="synthetic corpus size")
+    parser.add_argument("--corpus", help="JSONL(.gz) of recorded texts or documents instead of synthetic ones")
+    parser.add_argument("--score-size", type=int, default=10000, help="texts used by the (slow) scoring benchmark")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", nargs="*", choices=list(BENCHMARKS), help="run only these benchmarks")
+    parser.add_argument("--save", help="write the JSON report here")
+    parser.add_argument("--baseline", help="earlier report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed regression as a fraction")
+    args = parser.parse_args()
+
+    from baseAPI import BaseAPI
+    texts = load_corpus(args.corpus, args.size) if args.corpus else synthetic_corpus(args.size, BaseAPI.TRACKED_STOCKS)
+    report = run_benchmarks(texts, args.only, args.repeat, args.score_size)
+    print(json.dumps(report, indent=2))
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for regression in regressions:
+            print(f"❌ {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print("✅ No regressions against the baseline.", file=sys.stderr)
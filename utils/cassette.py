@@ -0,0 +1,297 @@
+import asyncio
+import base64
+import gzip
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from datetime import datetime
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import requests
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# CASSETTE_MODE=record captures every HTTP exchange (NewsAPI via requests/httpx,
+# Reddit via praw's requests session, Alpaca via AlpacaClient) into a gzipped
+# JSONL cassette; CASSETTE_MODE=replay serves them back without touching the network.
+CASSETTE_MODE = os.getenv("CASSETTE_MODE", "off").lower()
+CASSETTE_PATH = os.getenv("CASSETTE_PATH", "cassettes/pipeline.jsonl.gz")
+# Injected replay latency: "recorded" replays each response's recorded round
+# trip, a number is a fixed delay in ms, 0 serves immediately.
+CASSETTE_LATENCY = os.getenv("CASSETTE_LATENCY", "0")
+# Replays pin "now" (utils/clock.py) to this ISO time, or else to the time the
+# cassette was recorded, so windows and decay don't depend on when it runs
+CASSETTE_NOW = os.getenv("CASSETTE_NOW")
+
+# Request fields left out of the match key: credentials, and values that change
+# between runs (NewsAPI's "from" watermark, per-order ids).
+IGNORED_FIELDS = {"apiKey", "from", "client_order_id"}
+# Query fields holding comma-separated lists whose order doesn't matter
+UNORDERED_LIST_FIELDS = {"symbols"}
+# Response JSON fields blanked before a cassette is written
+REDACTED_FIELDS = {"access_token", "refresh_token"}
+KEPT_HEADERS = {"content-type", "retry-after"}
+
+class CassetteMiss(requests.exceptions.RequestException):
+    """
+    Replay found no recorded response for a request. A RequestException, so
+    callers handle it like the network error it stands in for.
+    """
+
+def _normalize(key, value):
+    if key in UNORDERED_LIST_FIELDS:
+        return ",".join(sorted(value.split(",")))
+    return value
+
+def _strip(pairs):
+    return sorted((key, _normalize(key, value)) for key, value in pairs if key not in IGNORED_FIELDS)
+
+def request_key(method, url, body=None):
+    """
+    Stable match key: method, URL with sorted query minus IGNORED_FIELDS (and
+    UNORDERED_LIST_FIELDS sorted), and the JSON or form body with the same
+    fields removed.
+    """
+    parts = urlsplit(url)
+    query = urlencode(_strip(parse_qsl(parts.query, keep_blank_values=True)))
+    key = f"{method.upper()} {urlunsplit((parts.scheme, parts.netloc, parts.path, query, ''))}"
+
+    if body:
+        if isinstance(body, bytes):
+            body = body.decode("utf-8", "replace")
+        try:
+            payload = json.loads(body)
+            if isinstance(payload, dict):
+                payload = {field: value for field, value in payload.items() if field not in IGNORED_FIELDS}
+            body = json.dumps(payload, sort_keys=True)
+        except ValueError:
+            body = urlencode(_strip(parse_qsl(body, keep_blank_values=True)))
+        key += f" {body}"
+    return key
+
+def _redact(body):
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return body
+    if isinstance(payload, dict) and REDACTED_FIELDS & payload.keys():
+        payload.update({field: "REDACTED" for field in REDACTED_FIELDS & payload.keys()})
+        return json.dumps(payload)
+    return body
+
+def _encode_body(content):
+    try:
+        return {"body": content.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"body_b64": base64.b64encode(content).decode("ascii")}
+
+def _decode_body(interaction):
+    if "body_b64" in interaction:
+        return base64.b64decode(interaction["body_b64"])
+    return interaction["body"].encode("utf-8")
+
+class Cassette:
+    """
+    Patches requests.Session.request and httpx.AsyncClient.send for the
+    duration of a record or replay session. Repeated requests with the same
+    key replay their responses in recorded order; the last one repeats after that.
+    """
+
+    def __init__(self, path=CASSETTE_PATH, mode=CASSETTE_MODE, latency=CASSETTE_LATENCY):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Cassette mode must be 'record' or 'replay', not {mode!r}")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.interactions = []
+        self.replay_queues = {}
+        self.recorded_at = None
+        self.hits = 0
+        self._lock = threading.Lock()
+        self._originals = None
+
+    def load(self):
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            for line in f:
+                interaction = json.loads(line)
+                if "recorded_at" in interaction:
+                    self.recorded_at = datetime.fromisoformat(interaction["recorded_at"])
+                    continue
+                self.replay_queues.setdefault(interaction["key"], []).append(interaction)
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with gzip.open(self.path, "wt", encoding="utf-8") as f:
+            f.write(json.dumps({"recorded_at": self.recorded_at.isoformat()}) + "\n")
+            for interaction in self.interactions:
+                f.write(json.dumps(interaction) + "\n")
+        print(f"📼 Recorded {len(self.interactions)} HTTP exchanges to {self.path}")
+
+    def delay(self, interaction):
+        """Seconds to wait before serving a replayed response."""
+        if self.latency == "recorded":
+            return interaction.get("elapsed_ms", 0) / 1000
+        return float(self.latency or 0) / 1000
+
+    def capture(self, key, status, headers, content, elapsed_ms):
+        # Only the key is stored for the request, so credentials in the URL never reach disk
+        interaction = {
+            "key": key,
+            "status": status,
+            "headers": {name.lower(): value for name, value in headers.items() if name.lower() in KEPT_HEADERS},
+            "elapsed_ms": round(elapsed_ms, 1),
+            **_encode_body(content)
+        }
+        if "body" in interaction:
+            interaction["body"] = _redact(interaction["body"])
+        with self._lock:
+            self.interactions.append(interaction)
+
+    def next_response(self, key):
+        with self._lock:
+            queue = self.replay_queues.get(key)
+            if not queue:
+                raise CassetteMiss(f"No recorded response for {key} in {self.path}")
+            self.hits += 1
+            return queue.pop(0) if len(queue) > 1 else queue[0]
+
+    def start(self):
+        import httpx
+
+        if self.mode == "replay":
+            self.load()
+        else:
+            self.recorded_at = datetime.utcnow()
+        cassette = self
+        original_request = requests.Session.request
+        original_send = httpx.AsyncClient.send
+
+        def session_request(session, method, url, **kwargs):
+            prepared = session.prepare_request(requests.Request(
+                method, url, params=kwargs.get("params"), data=kwargs.get("data"),
+                json=kwargs.get("json"), headers=kwargs.get("headers")
+            ))
+            key = request_key(method, prepared.url, prepared.body)
+
+            if cassette.mode == "replay":
+                interaction = cassette.next_response(key)
+                time.sleep(cassette.delay(interaction))
+                response = requests.Response()
+                response.status_code = interaction["status"]
+                response.headers.update(interaction["headers"])
+                response._content = _decode_body(interaction)
+                response.encoding = "utf-8"
+                response.url = prepared.url
+                response.request = prepared
+                return response
+
+            started = time.perf_counter()
+            response = original_request(session, method, url, **kwargs)
+            cassette.capture(key, response.status_code, response.headers, response.content,
+                             (time.perf_counter() - started) * 1000)
+            return response
+
+        async def client_send(client, request, **kwargs):
+            key = request_key(request.method, str(request.url), request.content)
+
+            if cassette.mode == "replay":
+                interaction = cassette.next_response(key)
+                await asyncio.sleep(cassette.delay(interaction))
+                return httpx.Response(interaction["status"], headers=interaction["headers"],
+                                      content=_decode_body(interaction), request=request)
+
+            started = time.perf_counter()
+            response = await original_send(client, request, **kwargs)
+            if not kwargs.get("stream"):
+                cassette.capture(key, response.status_code, response.headers, response.content,
+                                 (time.perf_counter() - started) * 1000)
+            return response
+
+        requests.Session.request = session_request
+        httpx.AsyncClient.send = client_send
+        self._originals = (requests, original_request, httpx, original_send)
+        print(f"📼 Cassette {self.mode}: {self.path}")
+        return self
+
+    def stop(self):
+        if self._originals is None:
+            return
+        requests, original_request, httpx, original_send = self._originals
+        requests.Session.request = original_request
+        httpx.AsyncClient.send = original_send
+        self._originals = None
+
+        if self.mode == "record":
+            self.save()
+        else:
+            print(f"📼 Replayed {self.hits} HTTP exchanges from {self.path}")
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+@contextmanager
+def replay_state(cassette, now=CASSETTE_NOW):
+    """
+    Known starting state for a replay: an empty mongomock database in place of
+    MongoDB (with the summary marked complete, as the database is empty) and
+    "now" pinned to now, or else to when the cassette was recorded.
+    """
+    from utils import clock
+    from utils.benchmark import stand_in_mongo
+    from utils.sentimentSummary import rebuild_summary
+
+    pinned = datetime.fromisoformat(now) if now else cassette.recorded_at
+    with stand_in_mongo(), clock.frozen(pinned):
+        rebuild_summary()
+        print(f"📼 Replaying against an empty mongomock database at {pinned or 'the current time'}")
+        yield
+
+_active = None
+
+def install_from_env():
+    """
+    Start the cassette named by CASSETTE_MODE/CASSETTE_PATH, if any, for the
+    rest of the process; replays also get replay_state.
+    """
+    global _active
+    if CASSETTE_MODE == "off" or _active is not None:
+        return _active
+    import atexit
+    stack = ExitStack()
+    _active = stack.enter_context(Cassette())
+    if _active.mode == "replay":
+        stack.enter_context(replay_state(_active))
+    atexit.register(stack.close)
+    return _active
+
+if __name__ == "__main__":
+    # python -m utils.cassette record|replay [path] [latency]
+    # Runs the full ingestion + trading path under the cassette. MongoDB is not
+    # recorded: record against any instance; replays start from an empty
+    # mongomock database (replay_state).
+    if len(sys.argv) < 2 or sys.argv[1] not in ("record", "replay"):
+        print("Usage: python -m utils.cassette record|replay [path] [latency_ms|recorded]")
+        sys.exit(2)
+
+    path = sys.argv[2] if len(sys.argv) > 2 else CASSETTE_PATH
+    latency = sys.argv[3] if len(sys.argv) > 3 else CASSETTE_LATENCY
+
+    from main import execute_trades, run_sentiment_analysis
+
+    with ExitStack() as stack:
+        cassette = stack.enter_context(Cassette(path, sys.argv[1], latency))
+        if cassette.mode == "replay":
+            stack.enter_context(replay_state(cassette))
+        print("🚀 Running sentiment analysis...")
+        print(run_sentiment_analysis())
+        print("📈 Running trading model based on sentiment data...")
+        execute_trades()
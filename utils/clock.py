@@ -0,0 +1,26 @@
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+# "Now" for everything that decides what a run sees: the sentiment window,
+# time decay, summary buckets and the timestamps stored on new documents.
+# Cassette replays (utils/cassette.py) pin it, so the same recording gives the
+# same windows and decisions on every replay.
+_now = None
+_lock = threading.Lock()
+
+def utcnow():
+    """The pinned time if a replay set one, else datetime.utcnow()."""
+    return _now or datetime.utcnow()
+
+@contextmanager
+def frozen(at):
+    """Pin utcnow() to at (a naive UTC datetime) for the duration of the block."""
+    global _now
+    with _lock:
+        previous, _now = _now, at
+    try:
+        yield
+    finally:
+        with _lock:
+            _now = previous
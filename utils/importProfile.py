@@ -0,0 +1,105 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Heavy dependencies that importing the Lambda entry point must not pull in;
+# they belong behind the lazy loaders in the stage modules.
+LAZY_PACKAGES = ["praw", "prawcore", "textblob", "nltk", "vaderSentiment", "pymongo", "requests", "httpx"]
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def profile_imports(module="main"):
+    """
+    Import module in a fresh interpreter under -X importtime and parse the
+    report into [{"module", "self_us", "cumulative_us", "depth"}], in import order.
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{completed.stderr}")
+
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append({
+            "module": name.strip(),
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us),
+            "depth": (len(name) - len(name.lstrip())) // 2
+        })
+    return rows
+
+def package_totals(rows):
+    """Self time summed per top-level package, i.e. what each dependency costs overall."""
+    totals = {}
+    for row in rows:
+        package = row["module"].split(".")[0]
+        totals[package] = totals.get(package, 0) + row["self_us"]
+    return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+def build_report(module="main"):
+    rows = profile_imports(module)
+    packages = package_totals(rows)
+    return {
+        "module": module,
+        "total_us": sum(row["self_us"] for row in rows),
+        "packages": packages,
+        "modules": sorted(rows, key=lambda row: row["cumulative_us"], reverse=True),
+        "eager_heavy": [package for package in LAZY_PACKAGES if package in packages]
+    }
+
+def compare(report, baseline, tolerance_ms):
+    """Packages whose import cost grew by more than tolerance_ms over the baseline."""
+    regressions = []
+    for package, cost in report["packages"].items():
+        previous = baseline["packages"].get(package, 0)
+        if (cost - previous) / 1000 > tolerance_ms:
+            regressions.append(f"{package}: {previous / 1000:.1f}ms -> {cost / 1000:.1f}ms")
+    return regressions
+
+def print_report(report, top):
+    print(f"📦 import {report['module']}: {report['total_us'] / 1000:.1f}ms total")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for row in report["modules"][:top]:
+        print(f"{row['cumulative_us'] / 1000:>14.1f} {row['self_us'] / 1000:>9.1f}  {'  ' * row['depth']}{row['module']}")
+    print(f"\n{'total ms':>14}  package")
+    for package, cost in list(report["packages"].items())[:top]:
+        print(f"{cost / 1000:>14.1f}  {package}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-module import cost report for the Lambda entry point.")
+    parser.add_argument("--module", default="main", help="module to import (default: main)")
+    parser.add_argument("--top", type=int, default=25, help="rows to show per table")
+    parser.add_argument("--budget-ms", type=float, help="fail if the total import time exceeds this")
+    parser.add_argument("--baseline", help="earlier --save output to compare against")
+    parser.add_argument("--tolerance-ms", type=float, default=20, help="allowed per-package growth over the baseline")
+    parser.add_argument("--save", help="write the report as JSON for use as a baseline")
+    parser.add_argument("--allow-eager", action="store_true", help="don't fail when heavy packages are imported eagerly")
+    args = parser.parse_args()
+
+    report = build_report(args.module)
+    print_report(report, args.top)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+
+    failures = []
+    if report["eager_heavy"] and not args.allow_eager:
+        failures.append(f"heavy packages imported eagerly: {', '.join(report['eager_heavy'])}")
+    if args.budget_ms is not None and report["total_us"] / 1000 > args.budget_ms:
+        failures.append(f"total {report['total_us'] / 1000:.1f}ms exceeds budget {args.budget_ms}ms")
+    if args.baseline:
+        with open(args.baseline) as f:
+            failures.extend(compare(report, json.load(f), args.tolerance_ms))
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures:
+        print("✅ Import profile OK.")
+    sys.exit(1 if failures else 0)
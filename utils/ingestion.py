@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from utils.metrics import metrics
+from utils.sentiment import SCORER_VERSION
+from utils.sentimentCache import get_sentiment_cache
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Seconds each source gets before it is reported as timed out
+SOURCE_TIMEOUT = float(os.getenv("INGESTION_SOURCE_TIMEOUT", 300))
+
+
+def _news_source(cancel):
+    from APIs.newsAPI import NewsAPI
+    return NewsAPI(cancel).fetch_financial_news_async
+
+
+def _reddit_source(cancel):
+    from APIs.redditAPI import RedditAPI
+    return RedditAPI(cancel).fetch_reddit_posts
+
+
+# name -> factory(cancel) returning the source's fetch callable (sync or async).
+# Sync callables run on the thread pool, coroutines run on the event loop.
+# cancel is a threading.Event set when the source times out; the fetch should
+# stop at its next stage boundary (BaseAPI.check_cancelled).
+SOURCES = {
+    "news": _news_source,
+    "reddit": _reddit_source,
+}
+
+
+def register_source(name, factory):
+    """Register an ingestion source so run_ingestion picks it up."""
+    SOURCES[name] = factory
+
+
+# Sources whose fetch is still running, possibly orphaned by a timeout on a
+# worker thread; a new run skips them rather than fetching alongside
+_running = set()
+_running_lock = threading.Lock()
+
+
+def _finished(name):
+    with _running_lock:
+        _running.discard(name)
+
+
+async def _run_source(name, factory, timeout):
+    """Run a single source under its timeout and summarise the outcome."""
+    started = time.perf_counter()
+    result = {"status": "ok", "inserted": 0, "elapsed": 0.0, "error": None}
+
+    with _running_lock:
+        busy = name in _running
+        _running.add(name)
+    if busy:
+        result["status"] = "skipped"
+        result["error"] = "previous run still running"
+        logger.warning(f"⏭️ Source {name} is still running from an earlier run, skipping it")
+        return name, result
+
+    cancel = threading.Event()
+    # A sync fetch clears its own entry when its thread really ends
+    handed_off = False
+    try:
+        fetch = factory(cancel)
+        if asyncio.iscoroutinefunction(fetch):
+            inserted = await asyncio.wait_for(fetch(), timeout)
+        else:
+            def run():
+                try:
+                    return fetch()
+                finally:
+                    _finished(name)
+
+            loop = asyncio.get_running_loop()
+            handed_off = True
+            inserted = await asyncio.wait_for(loop.run_in_executor(None, run), timeout)
+        result["inserted"] = inserted or 0
+    except asyncio.TimeoutError:
+        cancel.set()
+        result["status"] = "timeout"
+        result["error"] = f"exceeded {timeout}s"
+        logger.warning(f"⏱️ Source {name} timed out after {timeout}s, cancelling it")
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = str(e)
+        logger.exception(f"❌ Source {name} failed")
+    finally:
+        if not handed_off:
+            _finished(name)
+
+    result["elapsed"] = round(time.perf_counter() - started, 2)
+    metrics.record(f"source.{name}", result["elapsed"] * 1000, items=result["inserted"],
+                   errors=0 if result["status"] in ("ok", "skipped") else 1)
+    return name, result
+
+
+async def _run_all(sources, timeout):
+    results = await asyncio.gather(*[
+        _run_source(name, factory, timeout) for name, factory in sources.items()
+    ])
+    return dict(results)
+
+
+def run_ingestion(sources=None, timeout=SOURCE_TIMEOUT):
+    """
+    Run every registered ingestion source at the same time.
+    Returns {source: {"status", "inserted", "elapsed", "error"}}.
+    """
+    sources = sources or SOURCES
+    loop = asyncio.new_event_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=max(len(sources), 4)))
+
+    try:
+        summary = loop.run_until_complete(_run_all(sources, timeout))
+    finally:
+        # close() shuts the executor down without waiting, so a source that
+        # timed out inside a worker thread can't hold the invocation open.
+        loop.close()
+
+    for name, result in summary.items():
+        logger.info(f"📥 {name}: {result['status']} — {result['inserted']} inserted in {result['elapsed']}s")
+
+    cache = get_sentiment_cache(SCORER_VERSION)
+    if cache:
+        logger.info(f"🧠 Sentiment cache: {cache.stats()}")
+
+    return summary
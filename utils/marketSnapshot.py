@@ -0,0 +1,65 @@
+import logging
+from APIs.alpacaAPI import get_account_info, get_portfolio_positions, get_stock_data_many
+from APIs.alpacaStream import get_market_stream, get_quote_book
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class MarketSnapshot:
+    """
+    Broker state for one trading run: account, every open position and the
+    latest quotes, fetched with three calls up front. Decisions read from it,
+    and apply_trade() keeps cash and positions current after each order so
+    later symbols in the same run see the effect of earlier ones.
+    """
+
+    def __init__(self, account, positions, quotes):
+        self.account = account
+        self.cash = float(account["cash"]) if account else None
+        # None means the positions call failed, so ownership is unknown
+        self.positions = None
+        if positions is not None:
+            self.positions = {position["symbol"]: int(float(position["qty"])) for position in positions}
+        self.quotes = quotes or {}
+
+    @classmethod
+    def build(cls, symbols):
+        """
+        Fetch account, positions (one /positions call) and all quotes. Quotes
+        come from the streaming quote book when it is running; only symbols it
+        has no fresh quote for are fetched over REST (one call), and those are
+        subscribed so the next run finds them in the book.
+        """
+        quotes = {}
+        book = get_quote_book()
+        if book is not None:
+            quotes = book.stock_infos(symbols)
+        missing = [symbol for symbol in symbols if symbol not in quotes]
+        if missing:
+            if book is not None:
+                get_market_stream().subscribe(missing)
+            quotes.update(get_stock_data_many(missing) or {})
+        return cls(get_account_info(), get_portfolio_positions(), quotes)
+
+    def quote(self, symbol):
+        """Latest stock_info for the symbol, or None if Alpaca had no quote."""
+        return self.quotes.get(symbol)
+
+    def owned_shares(self, symbol):
+        """Shares held, 0 if none, None if positions couldn't be fetched."""
+        if self.positions is None:
+            return None
+        return self.positions.get(symbol, 0)
+
+    def apply_trade(self, symbol, side, qty, price):
+        """Reflect a placed order locally: move cash and adjust the position."""
+        signed_qty = qty if side == "buy" else -qty
+        if self.cash is not None:
+            self.cash -= signed_qty * price
+        if self.positions is not None:
+            remaining = self.positions.get(symbol, 0) + signed_qty
+            if remaining > 0:
+                self.positions[symbol] = remaining
+            else:
+                self.positions.pop(symbol, None)
+        logger.info(f"🧾 Snapshot updated after {side} {qty} {symbol}: cash ${self.cash}")
@@ -0,0 +1,160 @@
+import json
+import os
+import threading
+import time
+from functools import wraps
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Where flush() sends the invocation record: "emf" prints a CloudWatch Embedded
+# Metric Format line to stdout (Lambda ships it to CloudWatch Metrics), "file"
+# appends the same line to METRICS_FILE for local development. Comma-separated.
+EXPORTERS = [name.strip() for name in os.getenv("METRICS_EXPORTERS", "emf").split(",") if name.strip()]
+METRICS_FILE = os.getenv("METRICS_FILE", "metrics.jsonl")
+NAMESPACE = os.getenv("METRICS_NAMESPACE", "SentimentTrader")
+SERVICE = os.getenv("METRICS_SERVICE", "sentiment-trader")
+
+FIELDS = ("count", "wall_ms", "cpu_ms", "items", "errors")
+
+# EMF caps each metric directive at 100 metrics
+EMF_MAX_METRICS = 100
+
+class Stage:
+    """Handle yielded by timed(): lets the stage report how many items it handled."""
+
+    def __init__(self):
+        self.items = 0
+        self.failed = False
+
+    def add_items(self, count):
+        self.items += count or 0
+
+    def error(self):
+        """Count the stage as failed without raising."""
+        self.failed = True
+
+class Metrics:
+    """
+    Per-invocation totals keyed by stage name ("news.fetch_page", "mongo.insert",
+    ...). Thread-safe, since sources and fetch workers record concurrently.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.stages = {}
+            self.started = time.time()
+
+    def record(self, name, wall_ms, cpu_ms=0.0, items=0, errors=0):
+        with self._lock:
+            stage = self.stages.setdefault(name, dict.fromkeys(FIELDS, 0))
+            stage["count"] += 1
+            stage["wall_ms"] += wall_ms
+            stage["cpu_ms"] += cpu_ms
+            stage["items"] += items
+            stage["errors"] += errors
+
+    def timed(self, name):
+        return _Timer(self, name)
+
+    def _take(self, reset):
+        """Rounded per-stage totals and the period start; reset=True atomically starts a new period."""
+        with self._lock:
+            stages, started = self.stages, self.started
+            if reset:
+                self.stages = {}
+                self.started = time.time()
+        summary = {
+            name: {field: round(value, 1) if field.endswith("_ms") else value for field, value in stage.items()}
+            for name, stage in sorted(stages.items())
+        }
+        return summary, started
+
+    def summary(self):
+        """{stage: {count, wall_ms, cpu_ms, items, errors}} with times rounded to 0.1ms."""
+        return self._take(reset=False)[0]
+
+    def to_emf(self, dimensions=None, summary=None, started=None):
+        """
+        One CloudWatch EMF record for the invocation: every stage field becomes a
+        metric named "<stage>.<field>", all under the Service dimension.
+        """
+        if summary is None:
+            summary, started = self._take(reset=False)
+        dimensions = {"Service": SERVICE, **(dimensions or {})}
+        record = dict(dimensions)
+        metrics = []
+        for name, stage in summary.items():
+            for field, value in stage.items():
+                metric_name = f"{name}.{field}"
+                record[metric_name] = value
+                metrics.append({"Name": metric_name, "Unit": "Milliseconds" if field.endswith("_ms") else "Count"})
+
+        record["_aws"] = {
+            "Timestamp": int(started * 1000),
+            "CloudWatchMetrics": [
+                {"Namespace": NAMESPACE, "Dimensions": [list(dimensions)], "Metrics": metrics[i:i + EMF_MAX_METRICS]}
+                for i in range(0, max(len(metrics), 1), EMF_MAX_METRICS)
+            ]
+        }
+        return record
+
+    def flush(self, dimensions=None, exporters=None, reset=False):
+        """
+        Export the record through each configured exporter and return the stage
+        summary. reset=True starts a new period, for long-running processes.
+        """
+        summary, started = self._take(reset)
+        line = json.dumps(self.to_emf(dimensions, summary, started), default=str)
+        for exporter in exporters or EXPORTERS:
+            if exporter == "emf":
+                print(line, flush=True)
+            elif exporter == "file":
+                with open(METRICS_FILE, "a") as f:
+                    f.write(line + "\n")
+        return summary
+
+class _Timer:
+    """
+    Context manager and decorator recording wall time, CPU time of the calling
+    thread, items and errors for one stage. Inside a coroutine the CPU time is
+    the event loop thread's, so it includes other tasks that ran meanwhile.
+    """
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.stage = Stage()
+        self.wall_started = time.perf_counter()
+        self.cpu_started = time.thread_time()
+        return self.stage
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.record(
+            self.name,
+            (time.perf_counter() - self.wall_started) * 1000,
+            (time.thread_time() - self.cpu_started) * 1000,
+            self.stage.items,
+            1 if exc_type is not None or self.stage.failed else 0
+        )
+        return False
+
+    def __call__(self, func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with _Timer(self.metrics, self.name):
+                return func(*args, **kwargs)
+        return wrapper
+
+# The process-wide registry; lambda_handler resets it at the start of each invocation
+metrics = Metrics()
+
+def timed(name):
+    """`with timed("stage") as stage:` or `@timed("stage")` on the shared registry."""
+    return metrics.timed(name)
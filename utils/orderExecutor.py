@@ -0,0 +1,116 @@
+import hashlib
+import logging
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import requests
+from dotenv import load_dotenv
+from pymongo import UpdateOne
+from APIs.alpacaAPI import submit_order, trade_record_update
+from DB import dbConnection
+from utils.metrics import timed
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Orders of one run in flight at once; keep it at or below ALPACA_POOL_SIZE so
+# every request gets a pooled keep-alive connection
+CONCURRENCY = int(os.getenv("ORDER_CONCURRENCY", 4))
+# Alpaca's limit on client_order_id length
+MAX_CLIENT_ORDER_ID = 128
+
+def new_run_id():
+    """Id for one trading run; pass the same one when re-running it (e.g. a retried Lambda invocation)."""
+    return f"{datetime.utcnow():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+
+def client_order_id(run_id, symbol, side):
+    """
+    Deterministic client_order_id: the same run, symbol and side always give the
+    same id, so a resubmitted order is recognised by Alpaca instead of doubled.
+    """
+    order_id = f"{run_id}-{symbol}-{side}"
+    if len(order_id) > MAX_CLIENT_ORDER_ID:
+        order_id = hashlib.sha1(order_id.encode()).hexdigest()
+    return order_id
+
+def submit_orders(orders, run_id, concurrency=CONCURRENCY):
+    """
+    Submit the independent orders of one run ({"symbol", "qty", "side"} each,
+    at most one per symbol) with up to concurrency requests in flight.
+    Returns {symbol: Alpaca order, or None if it failed or wasn't placed}.
+    """
+    def submit(order):
+        try:
+            return submit_order(order["symbol"], order["qty"], order["side"],
+                                client_order_id(run_id, order["symbol"], order["side"]))
+        except requests.exceptions.RequestException as e:
+            logger.error(f"❌ Trade Failed for {order['side']} {order['qty']} {order['symbol']}: {e}")
+            return None
+
+    if not orders:
+        return {}
+    with timed("trading.submit_orders") as stage:
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(orders)), thread_name_prefix="order") as pool:
+            results = list(pool.map(submit, orders))
+        stage.add_items(len(orders))
+
+    submitted = {order["symbol"]: trade_info for order, trade_info in zip(orders, results)}
+    placed = [trade_info for trade_info in results if trade_info]
+    logger.info(f"✅ Submitted {len(placed)}/{len(orders)} orders for run {run_id}")
+    return submitted
+
+def run_entry_update(run_id, kind, entry):
+    """
+    UpdateOne storing one trade_decisions entry of a run, keyed by (run_id,
+    stock, kind) with kind "decision" or "trade". A re-run with the same run_id
+    keeps what was recorded first and only adds entries that are new.
+    """
+    key = {"run_id": run_id, "stock": entry["stock"], "kind": kind}
+    fields = {field: value for field, value in entry.items() if field not in key}
+    return UpdateOne(key, {"$setOnInsert": fields}, upsert=True)
+
+def record_plans(run_id, plans):
+    """
+    Store a run's decisions ({symbol: (decision_entry, order)}) before any order
+    is submitted, each with the order it planned, so a retry of the run can
+    replay them (load_plans) instead of deciding again against positions the
+    first attempt already changed.
+    """
+    operations = [
+        run_entry_update(run_id, "decision", {**decision_entry, "order": order})
+        for decision_entry, order in plans.values()
+    ]
+    if operations:
+        with timed("mongo.trading_plans") as stage:
+            dbConnection.trade_decision_collection.bulk_write(operations, ordered=False)
+            stage.add_items(len(operations))
+
+def load_plans(run_id):
+    """The plans record_plans stored for run_id, as {symbol: (decision_entry, order)}; empty for a new run."""
+    plans = {}
+    for entry in dbConnection.trade_decision_collection.find({"run_id": run_id, "kind": "decision"}):
+        order = entry.pop("order", None)
+        for field in ("_id", "run_id", "kind"):
+            entry.pop(field, None)
+        plans[entry["stock"]] = (entry, order)
+    return plans
+
+def record_run(run_id, results, trade_infos):
+    """
+    Store a run's placed orders: the trade entries ({symbol: (decision_entry,
+    trade_entry)}) in one bulk_write of upserts to trade_decisions, the orders in
+    one bulk_write to executed_trades. Safe to repeat for the same run.
+    """
+    operations = [
+        run_entry_update(run_id, "trade", trade_entry)
+        for _, trade_entry in results.values() if trade_entry
+    ]
+    with timed("mongo.trading_results") as stage:
+        if operations:
+            dbConnection.trade_decision_collection.bulk_write(operations, ordered=False)
+        if trade_infos:
+            dbConnection.trades_collection.bulk_write([trade_record_update(info) for info in trade_infos], ordered=False)
+        stage.add_items(len(operations) + len(trade_infos))
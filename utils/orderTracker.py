@@ -0,0 +1,245 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from pymongo import UpdateOne
+from dotenv import load_dotenv
+from DB import dbConnection
+from utils.metrics import timed
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Order events are written to executed_trades in one bulk write at most every
+# ORDER_FLUSH_INTERVAL seconds (or as soon as ORDER_FLUSH_SIZE are buffered)
+FLUSH_INTERVAL = float(os.getenv("ORDER_FLUSH_INTERVAL", 0.5))
+FLUSH_SIZE = int(os.getenv("ORDER_FLUSH_SIZE", 200))
+# How many recently closed order ids are remembered (see OrderTracker.closed)
+MAX_CLOSED = int(os.getenv("ORDER_TRACKER_MAX_CLOSED", 10000))
+
+# Order statuses after which no further fills can arrive
+TERMINAL_STATUSES = {"filled", "canceled", "rejected", "expired", "replaced", "done_for_day"}
+
+# Fields the trade_updates order object carries that executed_trades keeps current
+ORDER_FIELDS = ["status", "filled_qty", "filled_avg_price", "filled_at", "canceled_at", "failed_at", "expired_at"]
+
+def _number(value):
+    return float(value) if value not in (None, "") else None
+
+def order_update(update):
+    """
+    UpdateOne bringing the executed_trades record of one trade_updates event up
+    to date. Upserts on order_id, so an event that beats place_trade's own
+    write still lands; place_trade only fills in what the event lacks.
+    """
+    order = update["order"]
+    fields = {field: order.get(field) for field in ORDER_FIELDS if field in order}
+    for field in ("filled_qty", "filled_avg_price"):
+        if field in fields:
+            fields[field] = _number(fields[field])
+    fields.update({"last_event": update["event"], "updated_at": datetime.utcnow()})
+
+    operation = {
+        "$set": fields,
+        "$setOnInsert": {"symbol": order.get("symbol"), "side": order.get("side"), "client_order_id": order.get("client_order_id")}
+    }
+    if update["event"] in ("fill", "partial_fill"):
+        # $addToSet keeps a replayed event from being counted twice
+        operation["$addToSet"] = {"fills": {
+            "execution_id": update.get("execution_id"),
+            "price": _number(update.get("price")),
+            "qty": _number(update.get("qty")),
+            "timestamp": update.get("timestamp")
+        }}
+    return UpdateOne({"order_id": order["id"]}, operation, upsert=True)
+
+class OrderTracker:
+    """
+    In-memory table of open orders, kept current from trade_updates events, with
+    the same events written back to executed_trades in batched bulk updates.
+    The trading loop asks it about open orders instead of polling order status.
+    resync() reconciles the table with Alpaca's open orders after every
+    (re)connect, since events missed while disconnected never arrive.
+    """
+
+    def __init__(self, collection=None, flush_interval=FLUSH_INTERVAL, flush_size=FLUSH_SIZE, max_closed=MAX_CLOSED):
+        self.collection = collection
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.max_closed = max_closed
+        self.orders = {}
+        # Recently closed orders, so a late track() can't reopen them; oldest
+        # dropped first beyond max_closed (a late track() comes within seconds)
+        self.closed = OrderedDict()
+        self.pending = []
+        self.events = 0
+        # Bumped on every table change, so resync() can tell what changed while it fetched
+        self.version = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._flusher = None
+
+    def _close(self, order_id):
+        self.orders.pop(order_id, None)
+        self.closed[order_id] = True
+        self.closed.move_to_end(order_id)
+        while len(self.closed) > self.max_closed:
+            self.closed.popitem(last=False)
+
+    def _set(self, order):
+        self.version += 1
+        status = order.get("status")
+        if status in TERMINAL_STATUSES:
+            self._close(order["id"])
+            return
+        self.orders[order["id"]] = {
+            "symbol": order["symbol"],
+            "side": order["side"],
+            "qty": _number(order.get("qty")),
+            "filled_qty": _number(order.get("filled_qty")) or 0.0,
+            "status": status,
+            "client_order_id": order.get("client_order_id"),
+            "version": self.version
+        }
+
+    def track(self, order):
+        """Register an order just submitted over REST, unless its events got here first."""
+        with self._lock:
+            if order["id"] not in self.orders and order["id"] not in self.closed:
+                self._set(order)
+
+    def apply(self, update):
+        """Apply one trade_updates event: update the table and queue its write."""
+        with self._lock:
+            self._set(update["order"])
+            self.pending.append(order_update(update))
+            self.events += 1
+            full = len(self.pending) >= self.flush_size
+        if full:
+            self._wake.set()
+        logger.info(f"🧾 {update['event']} {update['order'].get('side')} {update['order'].get('symbol')}: "
+                    f"{update['order'].get('filled_qty')}/{update['order'].get('qty')} @ {update.get('price')}")
+
+    def resync(self, fetch=None):
+        """
+        Make the open-order table match Alpaca's open orders (one GET
+        /v2/orders?status=open): orders it no longer lists are closed, orders
+        missing here are added. Entries changed by events or track() while the
+        request was in flight are newer than its answer and kept as they are.
+        Returns (added, closed) counts.
+        """
+        if fetch is None:
+            from APIs.alpacaAPI import get_open_orders as fetch
+        with self._lock:
+            since = self.version
+        open_orders = {order["id"]: order for order in fetch()}
+
+        with self._lock:
+            stale = [
+                order_id for order_id, order in self.orders.items()
+                if order_id not in open_orders and order["version"] <= since
+            ]
+            for order_id in stale:
+                self._close(order_id)
+            added = 0
+            for order_id, order in open_orders.items():
+                if order_id not in self.orders and order_id not in self.closed:
+                    self._set(order)
+                    added += 1
+        logger.info(f"🔄 Resynced open orders: {len(open_orders)} open, {added} added, {len(stale)} closed while away")
+        return added, len(stale)
+
+    def flush(self):
+        """Write every queued event in one ordered bulk write (order matters per order_id)."""
+        with self._flush_lock:
+            with self._lock:
+                operations, self.pending = self.pending, []
+            if not operations:
+                return 0
+            collection = self.collection if self.collection is not None else dbConnection.trades_collection
+            try:
+                with timed("mongo.order_updates") as stage:
+                    collection.bulk_write(operations, ordered=True)
+                    stage.add_items(len(operations))
+            except Exception:
+                # Every operation is an idempotent $set/$addToSet upsert, so the
+                # whole batch can be retried even if part of it was applied
+                with self._lock:
+                    self.pending[:0] = operations
+                raise
+            return len(operations)
+
+    def open_orders(self, symbol=None):
+        """Snapshot of open orders by order_id, optionally for one symbol."""
+        with self._lock:
+            return {
+                order_id: {field: value for field, value in order.items() if field != "version"}
+                for order_id, order in self.orders.items()
+                if symbol is None or order["symbol"] == symbol
+            }
+
+    def has_open_order(self, symbol, side=None):
+        with self._lock:
+            return any(
+                order["symbol"] == symbol and (side is None or order["side"] == side)
+                for order in self.orders.values()
+            )
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("❌ Failed to write order updates, retrying with the next batch")
+
+    def start(self):
+        self._flusher = threading.Thread(target=self._run, name="order-flush", daemon=True)
+        self._flusher.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        if self._flusher:
+            self._flusher.join(timeout)
+        self.flush()
+
+class OrderTracking:
+    """Handle for a running tracker and the trade_updates stream feeding it."""
+
+    def __init__(self, tracker, stream):
+        self.tracker = tracker
+        self.stream = stream
+
+    def stop(self, timeout=None):
+        global _tracker
+        self.stream.stop(timeout)
+        self.tracker.stop(timeout)
+        _tracker = None
+
+_tracker = None
+
+def start_order_tracking(url=None):
+    """
+    Connect to trade_updates and start keeping executed_trades and the open
+    order table current, resyncing the table on every (re)connect. Returns an OrderTracking handle; call stop() on shutdown.
+    """
+    global _tracker
+    from APIs.alpacaStream import TRADE_STREAM_URL, TradeUpdatesStream
+
+    tracker = OrderTracker().start()
+    stream = TradeUpdatesStream(tracker.apply, url or TRADE_STREAM_URL, on_connect=tracker.resync)
+    stream.start()
+    _tracker = tracker
+    return OrderTracking(tracker, stream)
+
+def get_order_tracker():
+    """The running OrderTracker, or None when no trade_updates stream is connected."""
+    return _tracker
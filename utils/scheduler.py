@@ -0,0 +1,149 @@
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MARKET_TZ = ZoneInfo("America/New_York")
+MARKET_OPEN = (9, 30)
+MARKET_CLOSE = (16, 0)
+
+# Upper bound on one idle wait, so stop() and clock changes are noticed promptly
+MAX_IDLE = 1.0
+
+def is_market_open(timestamp):
+    """Regular NYSE session, Monday to Friday 9:30-16:00 New York time (holidays not modelled)."""
+    now = datetime.fromtimestamp(timestamp, MARKET_TZ)
+    minutes = now.hour * 60 + now.minute
+    return now.weekday() < 5 and MARKET_OPEN[0] * 60 + MARKET_OPEN[1] <= minutes < MARKET_CLOSE[0] * 60 + MARKET_CLOSE[1]
+
+def next_market_open(timestamp):
+    """Epoch seconds of the next regular session open after timestamp."""
+    now = datetime.fromtimestamp(timestamp, MARKET_TZ)
+    candidate = now.replace(hour=MARKET_OPEN[0], minute=MARKET_OPEN[1], second=0, microsecond=0)
+    if candidate <= now:
+        candidate += timedelta(days=1)
+    while candidate.weekday() >= 5:
+        candidate += timedelta(days=1)
+    return candidate.astimezone(timezone.utc).timestamp()
+
+class Job:
+    """
+    One recurring task. interval and jitter are seconds; each run is scheduled
+    interval +/- jitter after the previous one started. market_hours jobs only
+    run during the session, and their first run each day is at the open.
+    """
+
+    def __init__(self, name, func, interval, jitter=0.0, market_hours=False):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.jitter = min(jitter, interval / 2)
+        self.market_hours = market_hours
+        self.next_run = None
+        self.running = False
+        self.runs = 0
+        self.skipped = 0
+        self.failures = 0
+        self.last_duration = None
+
+    def stats(self):
+        return {
+            "runs": self.runs,
+            "skipped": self.skipped,
+            "failures": self.failures,
+            "last_duration": self.last_duration,
+            "next_run": self.next_run
+        }
+
+class Scheduler:
+    """
+    Runs jobs on independent cadences from one loop, each run on a worker
+    thread. A job that is still running when it falls due is skipped rather than
+    started twice. clock and the market-hours functions are injectable so the
+    schedule can be driven by a fake clock in tests.
+    """
+
+    def __init__(self, jobs, clock=time.time, market_open=is_market_open, next_open=next_market_open, rng=None):
+        self.jobs = {job.name: job for job in jobs}
+        self.clock = clock
+        self.market_open = market_open
+        self.next_open = next_open
+        self.rng = rng or random.Random()
+        self.executor = ThreadPoolExecutor(max_workers=max(len(self.jobs), 1), thread_name_prefix="job")
+        self.futures = set()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def _schedule(self, job, now, first=False):
+        if first:
+            # Spread the initial runs so every source doesn't fire at once
+            due = now + self.rng.uniform(0, job.jitter)
+        else:
+            due = now + job.interval + self.rng.uniform(-job.jitter, job.jitter)
+        if job.market_hours and not self.market_open(due):
+            due = self.next_open(due)
+        job.next_run = due
+
+    def _run(self, job):
+        started = time.perf_counter()
+        try:
+            job.func()
+        except Exception:
+            job.failures += 1
+            logger.exception(f"❌ Job {job.name} failed")
+        finally:
+            job.last_duration = round(time.perf_counter() - started, 2)
+            job.runs += 1
+            with self._lock:
+                job.running = False
+            logger.info(f"⏲️ Job {job.name} finished in {job.last_duration}s")
+
+    def tick(self):
+        """Start every due job that isn't already running; returns seconds until the next one is due."""
+        now = self.clock()
+        for job in self.jobs.values():
+            if job.next_run is None:
+                self._schedule(job, now, first=True)
+            if job.next_run > now or self._stop.is_set():
+                continue
+
+            with self._lock:
+                overlapping = job.running
+                job.running = True
+            if overlapping:
+                job.skipped += 1
+                logger.warning(f"⏭️ Job {job.name} still running, skipping this run")
+            else:
+                future = self.executor.submit(self._run, job)
+                self.futures.add(future)
+                future.add_done_callback(self.futures.discard)
+            self._schedule(job, now)
+
+        return max(min(job.next_run for job in self.jobs.values()) - self.clock(), 0)
+
+    def run(self):
+        """Loop until stop() is called, then wait for running jobs (see shutdown)."""
+        logger.info(f"🗓️ Scheduler started with jobs: {', '.join(self.jobs)}")
+        while not self._stop.is_set():
+            self._stop.wait(min(self.tick(), MAX_IDLE))
+
+    def stop(self):
+        self._stop.set()
+
+    def shutdown(self, timeout=None):
+        """Stop starting jobs and wait up to timeout seconds for running ones. Returns True if all finished."""
+        self.stop()
+        done, pending = wait(list(self.futures), timeout=timeout)
+        self.executor.shutdown(wait=False)
+        if pending:
+            logger.warning(f"⚠️ {len(pending)} job(s) still running at shutdown")
+        return not pending
+
+    def stats(self):
+        return {name: job.stats() for name, job in self.jobs.items()}
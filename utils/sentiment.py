@@ -1,32 +1,104 @@
-from textblob import TextBlob
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+import threading
+from utils.metrics import timed
+from utils.sentimentCache import get_sentiment_cache, text_key
+
+# Bump whenever analyze() would score the same text differently; cached
+# results from older versions are then ignored and purged.
+SCORER_VERSION = "1"
+
+HIGH_IMPACT_SOURCES = {"bloomberg", "cnbc", "reuters"}
+
+# textblob (which drags in nltk) and vaderSentiment dominate cold-start import
+# time, so they are loaded on the first text that actually needs scoring and
+# kept for warm invocations. Fully cached batches never load them at all.
+_scorers = None
+_scorers_lock = threading.Lock()
+
+def get_scorers():
+    """The shared (vader analyzer, pattern sentiment) pair, created on first use."""
+    global _scorers
+    if _scorers is None:
+        with _scorers_lock:
+            if _scorers is None:
+                with timed("sentiment.load_models"):
+                    from textblob.en import sentiment as pattern_sentiment
+                    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+                    _scorers = (SentimentIntensityAnalyzer(), pattern_sentiment)
+    return _scorers
 
 class SentimentAnalyzer:
     def __init__(self):
-        self.vader = SentimentIntensityAnalyzer()
+        self.cache = get_sentiment_cache(SCORER_VERSION)
+
+    def _polarity(self, text):
+        """
+        TextBlob's default (pattern) polarity and subjectivity, computed from one
+        tokenisation of the text. Same scores as TextBlob(text).polarity /
+        .subjectivity without building a TextBlob or scoring the text twice.
+        """
+        pattern_sentiment = get_scorers()[1]
+        words = [word.lower() for word in " ".join(pattern_sentiment.tokenizer(text)).split()]
+        return pattern_sentiment(words)
 
     def analyze(self, text):
         """Compute sentiment score using both VADER and TextBlob."""
+        return self.analyze_many([text])[0]
+
+    def _score(self, text):
         if not text:
             return {"vader_score": 0, "textblob_polarity": 0, "textblob_subjectivity": 0}
 
-        vader_score = self.vader.polarity_scores(text)["compound"]
-        blob = TextBlob(text)
+        vader_score = get_scorers()[0].polarity_scores(text)["compound"]
+        polarity, subjectivity = self._polarity(text)
         return {
             "vader_score": vader_score,
-            "textblob_polarity": blob.polarity,
-            "textblob_subjectivity": blob.subjectivity
+            "textblob_polarity": polarity,
+            "textblob_subjectivity": subjectivity
         }
 
+    def analyze_many(self, texts):
+        """
+        Score a batch of texts; returns one analyze()-style record per text, in order.
+        Texts already scored (this run, an earlier warm run, or elsewhere in the
+        batch) are served from the cache instead of being re-scored.
+        """
+        if not self.cache:
+            with timed("sentiment.score") as stage:
+                stage.add_items(len(texts))
+                return [self._score(text) for text in texts]
+
+        keys = [text_key(text or "") for text in texts]
+        results = self.cache.get_many(keys)
+
+        scored = {}
+        with timed("sentiment.score") as stage:
+            for key, text in zip(keys, texts):
+                if key not in results and key not in scored:
+                    scored[key] = self._score(text)
+            stage.add_items(len(scored))
+        self.cache.put_many(scored)
+        results.update(scored)
+
+        return [dict(results[key]) for key in keys]
+
     def calculate_expected_impact(self, text, sentiment, source=None):
         """
-        Generic impact score formula based on sentiment strength, source influence, 
+        Generic impact score formula based on sentiment strength, source influence,
         and stock mentions (for news).
         """
-        content_length_factor = len(text.split()) / 100 
-        sentiment_strength = abs(sentiment["vader_score"]) * 5 
-        source_factor = 2 if source and source.lower() in {"bloomberg", "cnbc", "reuters"} else 0
-        keyword_count = text.lower().count("stock") + text.lower().count("market")
+        lowered = text.lower()
+        content_length_factor = len(text.split()) / 100
+        sentiment_strength = abs(sentiment["vader_score"]) * 5
+        source_factor = 2 if source and source.lower() in HIGH_IMPACT_SOURCES else 0
+        keyword_count = lowered.count("stock") + lowered.count("market")
 
         expected_impact = round(sentiment_strength + content_length_factor + source_factor + keyword_count, 2)
         return expected_impact
+
+    def calculate_expected_impact_many(self, texts, sentiments, sources=None):
+        """Batch form of calculate_expected_impact; sources may be None or one per text."""
+        sources = sources or [None] * len(texts)
+        return [
+            self.calculate_expected_impact(text, sentiment, source)
+            for text, sentiment, source in zip(texts, sentiments, sources)
+        ]
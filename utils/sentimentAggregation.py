@@ -0,0 +1,140 @@
+import math
+import os
+from datetime import datetime
+from dotenv import load_dotenv
+from DB import dbConnection
+from utils import clock
+
+load_dotenv()
+
+# Half-life of the exponential time decay applied to each document's sentiment
+HALF_LIFE_HOURS = float(os.getenv("SENTIMENT_HALF_LIFE_HOURS", 6))
+
+SOURCE_COLLECTIONS = ["news_articles", "reddit_posts"]
+
+def decay_rate_per_ms(half_life_hours):
+    return math.log(2) / (half_life_hours * 3600 * 1000)
+
+def build_pipeline(window_start, now, half_life_hours=HALF_LIFE_HOURS, stocks=None):
+    """
+    Aggregation over news_articles unioned with reddit_posts: one row per ticker
+    with count, mean, time-decayed mean, impact-weighted mean and dispersion of
+    vader_score. Documents count towards every ticker in their "stocks" array.
+    stocks limits the result to those tickers.
+    """
+    window_match = {"$match": {"timestamp": {"$gte": window_start}}}
+    if stocks:
+        window_match["$match"]["$or"] = [{"stocks": {"$in": list(stocks)}}, {"stock": {"$in": list(stocks)}}]
+    decay_rate = decay_rate_per_ms(half_life_hours)
+
+    return [
+        window_match,
+        {"$unionWith": {"coll": SOURCE_COLLECTIONS[1], "pipeline": [window_match]}},
+        {"$project": {
+            # Documents written before multi-ticker extraction only have "stock"
+            "stocks": {"$ifNull": ["$stocks", ["$stock"]]},
+            "score": "$sentiment.vader_score",
+            "impact": "$expected_impact",
+            "timestamp": 1,
+            "weight": {"$exp": {"$multiply": [-decay_rate, {"$subtract": [now, "$timestamp"]}]}}
+        }},
+        {"$unwind": "$stocks"},
+        {"$match": {"stocks": {"$in": list(stocks)} if stocks else {"$ne": None}, "score": {"$ne": None}}},
+        {"$group": {
+            "_id": "$stocks",
+            "count": {"$sum": 1},
+            "mean_sentiment": {"$avg": "$score"},
+            "sentiment_std": {"$stdDevPop": "$score"},
+            "mean_impact": {"$avg": "$impact"},
+            "decay_weight": {"$sum": "$weight"},
+            "decay_weighted_sum": {"$sum": {"$multiply": ["$weight", "$score"]}},
+            "impact_sum": {"$sum": "$impact"},
+            "impact_weighted_sum": {"$sum": {"$multiply": ["$impact", "$score"]}},
+            "latest": {"$max": "$timestamp"}
+        }},
+        {"$project": {
+            "_id": 0,
+            "stock": "$_id",
+            "count": 1,
+            "mean_sentiment": 1,
+            "sentiment_std": 1,
+            "mean_impact": 1,
+            "latest": 1,
+            "decayed_sentiment": {"$cond": [
+                {"$gt": ["$decay_weight", 0]}, {"$divide": ["$decay_weighted_sum", "$decay_weight"]}, "$mean_sentiment"
+            ]},
+            "impact_weighted_sentiment": {"$cond": [
+                {"$gt": ["$impact_sum", 0]}, {"$divide": ["$impact_weighted_sum", "$impact_sum"]}, "$mean_sentiment"
+            ]}
+        }}
+    ]
+
+def aggregate_ticker_sentiment(window_start, now=None, half_life_hours=HALF_LIFE_HOURS, stocks=None):
+    """Run the pipeline server-side; returns {ticker: stats}."""
+    now = now or clock.utcnow()
+    collection = dbConnection.get_collection("sentimentData", SOURCE_COLLECTIONS[0])
+    rows = collection.aggregate(build_pipeline(window_start, now, half_life_hours, stocks))
+    return {row.pop("stock"): row for row in rows}
+
+def aggregate_records(records, window_start, now=None, half_life_hours=HALF_LIFE_HOURS):
+    """
+    Vectorised NumPy equivalent of aggregate_ticker_sentiment for offline use
+    (exports, backtests, benchmarks). records are documents shaped like the
+    stored news/reddit ones. NumPy is only needed for this path.
+    """
+    try:
+        import numpy as np
+    except ImportError as e:
+        raise ImportError("aggregate_records needs numpy: pip install numpy") from e
+
+    now = now or datetime.utcnow()
+    tickers, scores, impacts, ages_ms, timestamps = [], [], [], [], []
+    for record in records:
+        timestamp = record.get("timestamp")
+        score = record.get("sentiment", {}).get("vader_score")
+        if timestamp is None or timestamp < window_start or score is None:
+            continue
+        for stock in record.get("stocks") or [record.get("stock")]:
+            if stock:
+                tickers.append(stock)
+                scores.append(score)
+                # None stays missing: $avg skips it, $sum treats it as 0
+                impact = record.get("expected_impact")
+                impacts.append(np.nan if impact is None else impact)
+                ages_ms.append((now - timestamp).total_seconds() * 1000)
+                timestamps.append(timestamp)
+
+    if not tickers:
+        return {}
+
+    symbols, index = np.unique(np.array(tickers), return_inverse=True)
+    scores = np.asarray(scores, dtype=float)
+    impacts = np.asarray(impacts, dtype=float)
+    has_impact = ~np.isnan(impacts)
+    impacts = np.where(has_impact, impacts, 0.0)
+    weights = np.exp(-decay_rate_per_ms(half_life_hours) * np.asarray(ages_ms, dtype=float))
+
+    counts = np.bincount(index)
+    score_sums = np.bincount(index, weights=scores)
+    means = score_sums / counts
+    variances = np.bincount(index, weights=scores ** 2) / counts - means ** 2
+    decay_weights = np.bincount(index, weights=weights)
+    decay_sums = np.bincount(index, weights=weights * scores)
+    impact_sums = np.bincount(index, weights=impacts)
+    impact_counts = np.bincount(index, weights=has_impact.astype(float))
+    impact_weighted = np.bincount(index, weights=impacts * scores)
+    latest = np.full(len(symbols), np.iinfo(np.int64).min)
+    np.maximum.at(latest, index, np.array(timestamps, dtype="datetime64[us]").astype(np.int64))
+
+    results = {}
+    for i, symbol in enumerate(symbols):
+        results[str(symbol)] = {
+            "count": int(counts[i]),
+            "mean_sentiment": float(means[i]),
+            "sentiment_std": float(np.sqrt(max(variances[i], 0.0))),
+            "mean_impact": float(impact_sums[i] / impact_counts[i]) if impact_counts[i] else None,
+            "latest": latest[i].astype("datetime64[us]").astype(datetime),
+            "decayed_sentiment": float(decay_sums[i] / decay_weights[i]) if decay_weights[i] > 0 else float(means[i]),
+            "impact_weighted_sentiment": float(impact_weighted[i] / impact_sums[i]) if impact_sums[i] > 0 else float(means[i])
+        }
+    return results
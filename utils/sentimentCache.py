@@ -0,0 +1,126 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CACHE_ENABLED = os.getenv("SENTIMENT_CACHE_ENABLED", "true").lower() == "true"
+CACHE_SIZE = int(os.getenv("SENTIMENT_CACHE_SIZE", 10000))
+# /tmp survives between warm Lambda invocations; set to "" to keep the cache in memory only
+CACHE_PATH = os.getenv("SENTIMENT_CACHE_PATH", "/tmp/sentiment_cache.sqlite3")
+
+FIELDS = ("vader_score", "textblob_polarity", "textblob_subjectivity")
+# Stay under SQLite's bound-parameter limit on older builds
+LOOKUP_CHUNK = 500
+
+def text_key(text):
+    """Hash of the whitespace-normalised text, so reflowed copies of a headline share an entry."""
+    normalised = " ".join(text.split())
+    return hashlib.blake2b(normalised.encode("utf-8"), digest_size=16).hexdigest()
+
+class SentimentCache:
+    """
+    Two-tier memo of sentiment results keyed by text hash: a bounded in-process
+    LRU in front of a SQLite file. Every entry is tagged with the scorer version,
+    so bumping SCORER_VERSION invalidates everything scored by older logic.
+    """
+
+    def __init__(self, version, max_size=CACHE_SIZE, path=CACHE_PATH):
+        self.version = version
+        self.max_size = max_size
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.db = self._open(path) if path else None
+
+    def _open(self, path):
+        try:
+            db = sqlite3.connect(path, check_same_thread=False)
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS sentiment_cache ("
+                "key TEXT PRIMARY KEY, version TEXT, vader_score REAL, "
+                "textblob_polarity REAL, textblob_subjectivity REAL)"
+            )
+            db.execute("DELETE FROM sentiment_cache WHERE version != ?", (self.version,))
+            db.commit()
+            return db
+        except sqlite3.Error as e:
+            print(f"⚠️ Sentiment cache disabled on disk ({path}): {e}")
+            return None
+
+    def _remember(self, key, sentiment):
+        self.memory[key] = sentiment
+        self.memory.move_to_end(key)
+        if len(self.memory) > self.max_size:
+            self.memory.popitem(last=False)
+
+    def get_many(self, keys):
+        """Return {key: sentiment} for the keys already scored; counts hits and misses."""
+        found = {}
+        with self.lock:
+            missing = []
+            for key in keys:
+                if key in self.memory:
+                    self.memory.move_to_end(key)
+                    found[key] = self.memory[key]
+                else:
+                    missing.append(key)
+
+            for start in range(0, len(missing) if self.db else 0, LOOKUP_CHUNK):
+                chunk = missing[start:start + LOOKUP_CHUNK]
+                rows = self.db.execute(
+                    f"SELECT key, {', '.join(FIELDS)} FROM sentiment_cache "
+                    f"WHERE version = ? AND key IN ({','.join('?' * len(chunk))})",
+                    [self.version, *chunk]
+                ).fetchall()
+                for key, *values in rows:
+                    sentiment = dict(zip(FIELDS, values))
+                    self._remember(key, sentiment)
+                    found[key] = sentiment
+                self.disk_hits += len(rows)
+
+            hits = sum(1 for key in keys if key in found)
+            self.hits += hits
+            self.misses += len(keys) - hits
+        return found
+
+    def put_many(self, entries):
+        """Store {key: sentiment} in both tiers."""
+        if not entries:
+            return
+        with self.lock:
+            for key, sentiment in entries.items():
+                self._remember(key, sentiment)
+            if self.db:
+                self.db.executemany(
+                    "INSERT OR REPLACE INTO sentiment_cache VALUES (?, ?, ?, ?, ?)",
+                    [(key, self.version, *(sentiment[field] for field in FIELDS)) for key, sentiment in entries.items()]
+                )
+                self.db.commit()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "size": len(self.memory)
+        }
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+def get_sentiment_cache(version):
+    """Process-wide cache for a scorer version, or None when caching is disabled."""
+    if not CACHE_ENABLED:
+        return None
+    with _caches_lock:
+        if version not in _caches:
+            _caches[version] = SentimentCache(version)
+        return _caches[version]
@@ -0,0 +1,313 @@
+import logging
+import math
+import sys
+import uuid
+from datetime import datetime, timedelta
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+from DB import dbConnection
+from utils import clock
+from utils.metrics import timed
+from utils.sentimentAggregation import HALF_LIFE_HOURS, SOURCE_COLLECTIONS, aggregate_ticker_sentiment, decay_rate_per_ms
+
+BUCKET_MINUTES = 15
+REBUILD_BATCH_SIZE = 1000
+# ingestion_watermarks entry holding the first bucket the summary fully covers
+COVERAGE_KEY = {"source": "summary", "query": "coverage"}
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Each summary document holds running sums for one (stock, bucket):
+#   count, sum_score, sum_score_sq, sum_impact, impact_count, sum_impact_score,
+# latest (a missing impact adds 0 to the sums and nothing to impact_count, as
+# $sum and $avg treat nulls) plus decay state: sum over documents of exp(+rate * (t - bucket)) and the same
+# times vader_score. At read time multiplying by exp(-rate * (now - bucket))
+# gives each document's exact exp(-rate * (now - t)) weight, so the decayed mean
+# matches the raw aggregation. The sums are tied to SENTIMENT_HALF_LIFE_HOURS;
+# run a rebuild after changing it.
+#
+# Raw documents are stored with summarized=False and a summary_batch id, and
+# marked summarized once their batch is applied. Each row lists the batches
+# applied to it, so a batch that failed halfway can simply be applied again
+# (catch_up_summary) without counting any document twice. The coverage entry
+# says from which bucket on every stored document is in the summary; older
+# windows are served by the raw aggregation.
+
+def bucket_start(timestamp):
+    """Floor a timestamp to its BUCKET_MINUTES bucket."""
+    minute = timestamp.minute - timestamp.minute % BUCKET_MINUTES
+    return timestamp.replace(minute=minute, second=0, microsecond=0)
+
+def _increments(documents, half_life_hours):
+    """Fold documents into {(stock, bucket): sums} locally before writing."""
+    decay_rate = decay_rate_per_ms(half_life_hours)
+    increments = {}
+
+    for doc in documents:
+        timestamp = doc.get("timestamp")
+        score = (doc.get("sentiment") or {}).get("vader_score")
+        if timestamp is None or score is None:
+            continue
+        impact = doc.get("expected_impact")
+        bucket = bucket_start(timestamp)
+        growth = math.exp(decay_rate * (timestamp - bucket).total_seconds() * 1000)
+
+        for stock in doc.get("stocks") or [doc.get("stock")]:
+            if not stock:
+                continue
+            sums = increments.setdefault((stock, bucket), {
+                "count": 0, "sum_score": 0.0, "sum_score_sq": 0.0, "sum_impact": 0.0, "impact_count": 0,
+                "sum_impact_score": 0.0, "sum_growth": 0.0, "sum_growth_score": 0.0, "latest": timestamp
+            })
+            sums["count"] += 1
+            sums["sum_score"] += score
+            sums["sum_score_sq"] += score * score
+            if impact is not None:
+                sums["sum_impact"] += impact
+                sums["impact_count"] += 1
+                sums["sum_impact_score"] += impact * score
+            sums["sum_growth"] += growth
+            sums["sum_growth_score"] += growth * score
+            sums["latest"] = max(sums["latest"], timestamp)
+
+    return increments
+
+def prepare_documents(documents):
+    """Stamp documents about to be inserted as not yet summarized, with one batch id for the lot."""
+    batch = uuid.uuid4().hex
+    for doc in documents:
+        doc["summarized"] = False
+        doc["summary_batch"] = batch
+    return documents
+
+def _bulk_upsert(operations):
+    """
+    Unordered bulk write of the row upserts. A duplicate-key error means the
+    row already lists the batch (the $ne filter missed, so the upsert tried to
+    insert a second row) or a concurrent first insert of the row won; retrying
+    once applies the latter and is a no-op for the former.
+    """
+    for attempt in range(2):
+        try:
+            dbConnection.summary_collection.bulk_write(operations, ordered=False)
+            return
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if any(error.get("code") != 11000 for error in errors):
+                raise
+            operations = [operations[error["index"]] for error in errors]
+
+def record_documents(documents, half_life_hours=HALF_LIFE_HOURS, collection=None):
+    """
+    Apply news/reddit documents to the summary with one bulk write of $inc
+    upserts. Documents stamped by prepare_documents are applied at most once
+    per batch, however often this is retried. With collection given they are
+    then marked summarized there. Returns the number of row updates sent.
+    """
+    by_batch = {}
+    for doc in documents:
+        by_batch.setdefault(doc.get("summary_batch"), []).append(doc)
+
+    operations = []
+    for batch, batch_documents in by_batch.items():
+        for (stock, bucket), sums in _increments(batch_documents, half_life_hours).items():
+            latest = sums.pop("latest")
+            query = {"stock": stock, "bucket": bucket}
+            update = {"$inc": sums, "$max": {"latest": latest}}
+            if batch:
+                # Relies on the stock_bucket_unique index (DB/indexes.py)
+                query["batches"] = {"$ne": batch}
+                update["$addToSet"] = {"batches": batch}
+            operations.append(UpdateOne(query, update, upsert=True))
+
+    if operations:
+        with timed("mongo.summary_write") as stage:
+            _bulk_upsert(operations)
+            stage.add_items(len(operations))
+
+    ids = [doc["_id"] for doc in documents if "_id" in doc]
+    if collection is not None and ids:
+        collection.update_many({"_id": {"$in": ids}}, {"$set": {"summarized": True}, "$unset": {"summary_batch": ""}})
+    return len(operations)
+
+def catch_up_summary(collection, half_life_hours=HALF_LIFE_HOURS, exclude_batches=()):
+    """
+    Apply the collection's documents whose summary write failed earlier, except
+    those of exclude_batches (being written by the caller). Returns how many.
+    """
+    projection = {"timestamp": 1, "stock": 1, "stocks": 1, "sentiment.vader_score": 1,
+                  "expected_impact": 1, "summary_batch": 1}
+    query = {"summarized": False}
+    if exclude_batches:
+        query["summary_batch"] = {"$nin": list(exclude_batches)}
+    pending = list(collection.find(query, projection))
+    if pending:
+        record_documents(pending, half_life_hours, collection)
+        logger.info(f"🔁 Caught up {len(pending)} unsummarized documents in {collection.name}")
+    return len(pending)
+
+_coverage_set = False
+
+def _set_coverage():
+    """
+    On the first live write, record the first bucket the summary fully covers:
+    the one after the current bucket, since this bucket may hold documents
+    stored before the summary existed. Never moves an existing entry.
+    Also makes sure the indexes exist: without stock_bucket_unique a replayed
+    batch would be counted twice.
+    """
+    global _coverage_set
+    if _coverage_set:
+        return
+    from DB.indexes import ensure_indexes
+    ensure_indexes()
+    covered_from = bucket_start(clock.utcnow()) + timedelta(minutes=BUCKET_MINUTES)
+    dbConnection.watermark_collection.update_one(
+        COVERAGE_KEY, {"$setOnInsert": {"value": covered_from, "updated_at": datetime.utcnow()}}, upsert=True
+    )
+    _coverage_set = True
+
+def record_new_documents(collection, documents):
+    """
+    Ingestion hook, called right after insert_many_new: first retries any
+    earlier failed summary writes for the collection, then applies the new
+    documents. Failures are logged, not raised; the documents are already
+    stored, stay marked unsummarized and are picked up by the next call.
+    """
+    try:
+        _set_coverage()
+        batches = {doc["summary_batch"] for doc in documents if doc.get("summary_batch")}
+        catch_up_summary(collection, exclude_batches=batches)
+        return record_documents(documents, collection=collection)
+    except PyMongoError as e:
+        logger.warning(f"⚠️ Summary write for {collection.name} failed, will retry on the next ingestion: {e}")
+        return 0
+
+def summary_covers(window_start):
+    """
+    True if the summary holds every stored document from window_start's bucket
+    on: the window starts at or after the coverage entry and no document is
+    still waiting for its summary write.
+    """
+    coverage = dbConnection.watermark_collection.find_one(COVERAGE_KEY)
+    if not coverage or coverage["value"] > bucket_start(window_start):
+        return False
+    return not any(
+        dbConnection.get_collection("sentimentData", collection_name).find_one({"summarized": False}, {"_id": 1})
+        for collection_name in SOURCE_COLLECTIONS
+    )
+
+def summarize_window(window_start, now=None, half_life_hours=HALF_LIFE_HOURS, stocks=None):
+    """
+    Per-ticker window statistics from the summary buckets, same shape as
+    aggregate_ticker_sentiment. window_start is floored to a bucket boundary;
+    stocks limits the result to those tickers.
+    """
+    now = now or clock.utcnow()
+    decay_rate = decay_rate_per_ms(half_life_hours)
+    totals = {}
+
+    query = {"bucket": {"$gte": bucket_start(window_start)}}
+    if stocks:
+        query["stock"] = {"$in": list(stocks)}
+    for row in dbConnection.summary_collection.find(query):
+        decay = math.exp(-decay_rate * (now - row["bucket"]).total_seconds() * 1000)
+        total = totals.setdefault(row["stock"], {
+            "count": 0, "sum_score": 0.0, "sum_score_sq": 0.0, "sum_impact": 0.0, "impact_count": 0,
+            "sum_impact_score": 0.0, "decay_weight": 0.0, "decay_weighted_sum": 0.0, "latest": row["latest"]
+        })
+        for field in ("count", "sum_score", "sum_score_sq", "sum_impact", "sum_impact_score"):
+            total[field] += row[field]
+        # Rows written before impact_count existed counted every document
+        total["impact_count"] += row.get("impact_count", row["count"])
+        total["decay_weight"] += decay * row["sum_growth"]
+        total["decay_weighted_sum"] += decay * row["sum_growth_score"]
+        total["latest"] = max(total["latest"], row["latest"])
+
+    results = {}
+    for stock, total in totals.items():
+        count = total["count"]
+        if not count:
+            continue
+        mean = total["sum_score"] / count
+        results[stock] = {
+            "count": count,
+            "mean_sentiment": mean,
+            "sentiment_std": math.sqrt(max(total["sum_score_sq"] / count - mean * mean, 0.0)),
+            "mean_impact": total["sum_impact"] / total["impact_count"] if total["impact_count"] else None,
+            "latest": total["latest"],
+            "decayed_sentiment": total["decay_weighted_sum"] / total["decay_weight"] if total["decay_weight"] > 0 else mean,
+            "impact_weighted_sentiment": total["sum_impact_score"] / total["sum_impact"] if total["sum_impact"] > 0 else mean
+        }
+    return results
+
+def rebuild_summary(half_life_hours=HALF_LIFE_HOURS):
+    """
+    Recompute the whole summary from the raw news/reddit documents, marking
+    them all summarized; afterwards the summary covers every window.
+    """
+    dbConnection.summary_collection.delete_many({})
+    projection = {"timestamp": 1, "stock": 1, "stocks": 1, "sentiment.vader_score": 1, "expected_impact": 1}
+
+    documents = 0
+    for collection_name in SOURCE_COLLECTIONS:
+        collection = dbConnection.get_collection("sentimentData", collection_name)
+        batch = []
+        for doc in collection.find({}, projection):
+            batch.append(doc)
+            if len(batch) >= REBUILD_BATCH_SIZE:
+                record_documents(batch, half_life_hours, collection)
+                documents += len(batch)
+                batch = []
+        record_documents(batch, half_life_hours, collection)
+        documents += len(batch)
+
+    dbConnection.watermark_collection.update_one(
+        COVERAGE_KEY, {"$set": {"value": datetime(1970, 1, 1), "updated_at": datetime.utcnow()}}, upsert=True
+    )
+
+    print(f"✅ Rebuilt ticker_sentiment_summary from {documents} documents")
+    return documents
+
+def verify_summary(window_start, now=None, tolerance=1e-6):
+    """
+    Compare summary-based statistics with the raw aggregation over the same
+    bucket-aligned window. Returns a list of mismatch descriptions (empty if they agree).
+    """
+    now = now or clock.utcnow()
+    window_start = bucket_start(window_start)
+    from_summary = summarize_window(window_start, now)
+    from_raw = aggregate_ticker_sentiment(window_start, now)
+
+    mismatches = []
+    for stock in sorted(set(from_summary) | set(from_raw)):
+        if stock not in from_summary or stock not in from_raw:
+            mismatches.append(f"{stock}: only in {'summary' if stock in from_summary else 'raw documents'}")
+            continue
+        for field in ("count", "mean_sentiment", "sentiment_std", "mean_impact",
+                      "decayed_sentiment", "impact_weighted_sentiment"):
+            summary_value, raw_value = from_summary[stock][field], from_raw[stock][field]
+            if summary_value is None or raw_value is None:
+                if summary_value is not raw_value:
+                    mismatches.append(f"{stock}.{field}: summary={summary_value} raw={raw_value}")
+                continue
+            if abs(summary_value - raw_value) > tolerance * max(1.0, abs(raw_value)):
+                mismatches.append(f"{stock}.{field}: summary={summary_value} raw={raw_value}")
+    return mismatches
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "verify"
+    if command == "rebuild":
+        rebuild_summary()
+
+    if command in ("rebuild", "verify"):
+        from baseAPI import market_window_start
+        mismatches = verify_summary(market_window_start())
+        for mismatch in mismatches:
+            print(f"❌ {mismatch}")
+        print("✅ Summary agrees with raw documents." if not mismatches else f"⚠️ {len(mismatches)} mismatches.")
+        sys.exit(1 if mismatches else 0)
+
+    print("Usage: python -m utils.sentimentSummary [rebuild|verify]")
+    sys.exit(2)
@@ -0,0 +1,256 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import base64
+import gzip
+import hashlib
+import json
+import logging
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Local stand-ins for the Alpaca websockets (RFC 6455 over plain TCP, stdlib
+# only). They speak the same auth/subscribe protocols and replay recorded
+# messages: market data (APIs/alpacaStream.py record_path) for the subscribed
+# symbols, or trade_updates events for the trading stream.
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+OP_TEXT, OP_CLOSE, OP_PING, OP_PONG = 0x1, 0x8, 0x9, 0xA
+
+def load_messages(path):
+    """Recorded stream messages from a (gzipped) JSONL file."""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def encode_frame(payload, opcode=OP_TEXT):
+    """Unmasked server frame."""
+    if isinstance(payload, str):
+        payload = payload.encode("utf-8")
+    header = bytes([0x80 | opcode])
+    length = len(payload)
+    if length < 126:
+        header += bytes([length])
+    elif length < 1 << 16:
+        header += bytes([126]) + struct.pack("!H", length)
+    else:
+        header += bytes([127]) + struct.pack("!Q", length)
+    return header + payload
+
+def _read_exact(rfile, size):
+    data = rfile.read(size)
+    if len(data) < size:
+        raise ConnectionError("client closed the connection")
+    return data
+
+def read_frame(rfile):
+    """(opcode, payload) of the next client frame, unmasked."""
+    first, second = _read_exact(rfile, 2)
+    length = second & 0x7F
+    if length == 126:
+        length = struct.unpack("!H", _read_exact(rfile, 2))[0]
+    elif length == 127:
+        length = struct.unpack("!Q", _read_exact(rfile, 8))[0]
+    mask = _read_exact(rfile, 4) if second & 0x80 else None
+    payload = _read_exact(rfile, length)
+    if mask:
+        payload = bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+    return first & 0x0F, payload
+
+class ReplayHandler(socketserver.StreamRequestHandler):
+    """One client connection: handshake, auth, subscriptions and the replay loop."""
+
+    def handshake(self):
+        request_line = self.rfile.readline()
+        headers = {}
+        while True:
+            line = self.rfile.readline().decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if b"GET" not in request_line or "sec-websocket-key" not in headers:
+            self.wfile.write(b"HTTP/1.1 400 Bad Request\r\n\r\n")
+            return False
+        accept = base64.b64encode(hashlib.sha1((headers["sec-websocket-key"] + WS_GUID).encode()).digest()).decode()
+        self.wfile.write((
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+        ).encode())
+        return True
+
+    def send(self, messages):
+        with self.send_lock:
+            self.wfile.write(encode_frame(json.dumps(messages)))
+
+    def greet(self):
+        self.send([{"T": "success", "msg": "connected"}])
+
+    def replay(self, message):
+        self.send([message])
+
+    def subscription(self):
+        return {"T": "subscription", **{channel: sorted(symbols) for channel, symbols in self.channels.items()}}
+
+    def handle_action(self, message):
+        action = message.get("action")
+        if action == "auth":
+            if self.server.credentials and (message.get("key"), message.get("secret")) != self.server.credentials:
+                self.send([{"T": "error", "code": 402, "msg": "auth failed"}])
+                return
+            self.authenticated = True
+            self.send([{"T": "success", "msg": "authenticated"}])
+        elif not self.authenticated:
+            self.send([{"T": "error", "code": 401, "msg": "not authenticated"}])
+        elif action in ("subscribe", "unsubscribe"):
+            for channel in self.channels:
+                symbols = set(message.get(channel) or [])
+                if action == "subscribe":
+                    self.channels[channel] |= symbols
+                else:
+                    self.channels[channel] -= symbols
+            self.send([self.subscription()])
+            self.subscribed.set()
+
+    def read_loop(self):
+        try:
+            while not self.closed.is_set():
+                opcode, payload = read_frame(self.rfile)
+                if opcode == OP_TEXT:
+                    self.handle_action(json.loads(payload))
+                elif opcode == OP_PING:
+                    with self.send_lock:
+                        self.wfile.write(encode_frame(payload, OP_PONG))
+                elif opcode == OP_CLOSE:
+                    with self.send_lock:
+                        self.wfile.write(encode_frame(payload[:2], OP_CLOSE))
+                    break
+        except (ConnectionError, OSError, ValueError):
+            pass
+        self.closed.set()
+
+    def wanted(self, message):
+        channel = {"q": "quotes", "t": "trades", "b": "bars"}.get(message.get("T"))
+        return channel is not None and message.get("S") in self.channels[channel]
+
+    def handle(self):
+        if not self.handshake():
+            return
+        self.send_lock = threading.Lock()
+        self.channels = {"quotes": set(), "trades": set(), "bars": set()}
+        self.authenticated = False
+        self.subscribed = threading.Event()
+        self.closed = threading.Event()
+        self.server.connections += 1
+        self.greet()
+
+        reader = threading.Thread(target=self.read_loop, daemon=True)
+        reader.start()
+        if not self.subscribed.wait(10):
+            return
+
+        sent = 0
+        try:
+            for message in self.server.messages:
+                if self.closed.is_set():
+                    break
+                if not self.wanted(message):
+                    continue
+                self.replay(message)
+                sent += 1
+                if self.server.disconnect_after and sent >= self.server.disconnect_after and self.server.connections == 1:
+                    # Simulate a dropped connection on the first session only
+                    logger.info(f"✂️ Dropping connection after {sent} messages")
+                    self.request.shutdown(socket.SHUT_RDWR)
+                    return
+                if self.server.interval:
+                    time.sleep(self.server.interval)
+            # Keep the connection open until the client leaves
+            self.closed.wait()
+        except OSError:
+            pass
+
+class TradeUpdatesReplayHandler(ReplayHandler):
+    """Trading stream protocol: auth, then listen to trade_updates; one JSON object per frame."""
+
+    def greet(self):
+        self.streams = set()
+
+    def replay(self, message):
+        self.send(message)
+
+    def handle_action(self, message):
+        action = message.get("action")
+        if action in ("auth", "authenticate"):
+            data = message.get("data") or {}
+            credentials = (message.get("key", data.get("key_id")), message.get("secret", data.get("secret_key")))
+            status = "authorized" if not self.server.credentials or credentials == self.server.credentials else "unauthorized"
+            self.authenticated = status == "authorized"
+            self.send({"stream": "authorization", "data": {"status": status, "action": "authenticate"}})
+        elif action == "listen" and self.authenticated:
+            self.streams = set((message.get("data") or {}).get("streams") or [])
+            self.send({"stream": "listening", "data": {"streams": sorted(self.streams)}})
+            self.subscribed.set()
+
+    def wanted(self, message):
+        return message.get("stream") in self.streams
+
+class ReplayServer(socketserver.ThreadingTCPServer):
+    """
+    Replays messages to every client that authenticates and subscribes.
+    interval is the pause between messages; disconnect_after drops the first
+    connection after that many messages, to exercise reconnects.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, messages, host="127.0.0.1", port=0, interval=0.0, disconnect_after=None, credentials=None,
+                 handler=ReplayHandler):
+        super().__init__((host, port), handler)
+        self.messages = messages
+        self.interval = interval
+        self.disconnect_after = disconnect_after
+        self.credentials = credentials
+        self.connections = 0
+
+    @property
+    def url(self):
+        host, port = self.server_address
+        return f"ws://{host}:{port}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name="stream-replay", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+if __name__ == "__main__":
+    # Usage: python -m utils.streamReplay <recording.jsonl.gz> [port] [interval_seconds]
+    # Recordings of trade_updates messages ({"stream": "trade_updates", ...}) are
+    # served with the trading stream protocol.
+    if len(sys.argv) < 2:
+        print("Usage: python -m utils.streamReplay <recording.jsonl.gz> [port] [interval_seconds]")
+        sys.exit(1)
+
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 8765
+    interval = float(sys.argv[3]) if len(sys.argv) > 3 else 0.01
+    messages = load_messages(sys.argv[1])
+    trading = bool(messages) and "stream" in messages[0]
+    server = ReplayServer(messages, port=port, interval=interval,
+                          handler=TradeUpdatesReplayHandler if trading else ReplayHandler)
+    url_setting = "ALPACA_TRADE_STREAM_URL" if trading else "ALPACA_MARKET_STREAM_URL"
+    print(f"📼 Replaying {len(server.messages)} messages on {server.url} (set {url_setting} to use it)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
@@ -0,0 +1,95 @@
+import os
+import re
+
+# One pass over the text pulls out every symbol-shaped token: 1-6 alphanumerics
+# starting with a letter, an optional share-class suffix (BRK.B, BF-B) and an
+# optional "$" cashtag. The lookarounds reject tokens embedded in longer words,
+# so AMC never matches inside AMCX and META never matches inside "metadata".
+# A suffixed token that isn't tracked falls back to the bare symbol, so run-on
+# text like "sold NVDA.I think" still counts NVDA.
+# Lookup is then a set membership test, so cost grows with text length only,
+# not with the size of the ticker universe.
+TOKEN_PATTERN = re.compile(r"(?<![\w$])(\$?)([A-Za-z][A-Za-z0-9]{0,5})([.\-][A-Za-z])?(?!\w)")
+
+# Symbols that are also everyday words or acronyms only count as a cashtag
+# ("$ALL", "$ON"), otherwise a universe like the Russell 3000 fires on prose.
+CASHTAG_ONLY = {
+    "A", "AI", "ALL", "AM", "AN", "ANY", "ARE", "AT", "BE", "BIG", "BY", "CAN", "CASH",
+    "CEO", "DAY", "EPS", "EU", "FAST", "FOR", "GO", "GOOD", "HAS", "HE", "IPO", "IT",
+    "KEY", "LOVE", "LOW", "ME", "MY", "NEW", "NICE", "NOW", "ON", "ONE", "OR", "OUT",
+    "REAL", "SEE", "SO", "TWO", "UK", "US", "USA", "WELL",
+}
+
+
+def load_universe(default_symbols):
+    """
+    Ticker universe to track: one symbol per line from TICKER_UNIVERSE_FILE
+    if it is set, otherwise the given default list.
+    """
+    path = os.getenv("TICKER_UNIVERSE_FILE")
+    if not path:
+        return list(default_symbols)
+
+    with open(path) as f:
+        return [line.strip().upper() for line in f if line.strip() and not line.startswith("#")]
+
+
+class TickerMatcher:
+    def __init__(self, symbols, cashtag_only=CASHTAG_ONLY):
+        # Universe order is the priority order used by first()
+        self.priority = {}
+        for symbol in symbols:
+            self.priority.setdefault(symbol.upper(), len(self.priority))
+
+        # Single-letter symbols are always too ambiguous to match bare
+        self.cashtag_only = {
+            symbol for symbol in self.priority if symbol in cashtag_only or len(symbol) == 1
+        }
+
+    def iter_matches(self, text):
+        """Yield (symbol, offset) for every tracked ticker mention, in text order."""
+        if not text:
+            return
+
+        for match in TOKEN_PATTERN.finditer(text):
+            cashtag, base, suffix = match.groups()
+            for token in ((base + suffix, base) if suffix else (base,)):
+                if cashtag:
+                    symbol = token.upper()
+                    if symbol in self.priority:
+                        yield symbol, match.start()
+                        break
+                elif token in self.priority and token not in self.cashtag_only:
+                    # Bare tickers must be written in capitals, as before
+                    yield token, match.start()
+                    break
+
+    def contains(self, text):
+        """True as soon as any tracked ticker is found."""
+        for _ in self.iter_matches(text):
+            return True
+        return False
+
+    def extract(self, text):
+        """
+        Every tracked ticker mentioned, from a single pass over the text:
+        {symbol: {"count": n, "positions": [offsets]}}, in order of first mention.
+        """
+        mentions = {}
+        for symbol, offset in self.iter_matches(text):
+            mention = mentions.setdefault(symbol, {"count": 0, "positions": []})
+            mention["count"] += 1
+            mention["positions"].append(offset)
+        return mentions
+
+    def first(self, text):
+        """The mentioned ticker that comes first in universe order, or None."""
+        found = {symbol for symbol, _ in self.iter_matches(text)}
+        if not found:
+            return None
+        return min(found, key=self.priority.get)
+
+
+def rank_mentions(mentions):
+    """Tickers ordered by mention count, ties broken by earliest mention."""
+    return sorted(mentions, key=lambda symbol: (-mentions[symbol]["count"], mentions[symbol]["positions"][0]))
@@ -0,0 +1,258 @@
+import logging
+import os
+import queue
+import threading
+import time
+from dotenv import load_dotenv
+from utils.metrics import metrics
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Where new-sentiment events come from: "queue" (ingestion in this process
+# publishes them), "change_stream" (Mongo change streams on the news/reddit
+# collections, needs a replica set) or "auto" (change streams when available).
+EVENT_SOURCE = os.getenv("EVENT_SOURCE", "auto").lower()
+# Events for a ticker are collected for this long after the first one, then
+# the ticker is re-evaluated once with everything that arrived
+DEBOUNCE_SECONDS = float(os.getenv("EVENT_DEBOUNCE_SECONDS", 5))
+QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", 10000))
+# Only trade on events during the regular session, like the scheduled trading
+# job (the daemon passes its DAEMON_TRADING_MARKET_HOURS instead)
+MARKET_HOURS = os.getenv("EVENT_TRADING_MARKET_HOURS", "true").lower() == "true"
+WATCHED_COLLECTIONS = {"news": "news_collection", "reddit": "reddit_collection"}
+
+def document_event(document, source):
+    """The event for one stored news/reddit document: its tickers and ingestion time."""
+    return {
+        "stocks": [stock for stock in document.get("stocks") or [document.get("stock")] if stock],
+        "ingested_at": document.get("timestamp"),
+        "source": source
+    }
+
+class EventBus:
+    """
+    Bounded in-process queue of sentiment events. publish() is a no-op until a
+    consumer enables the bus, so the Lambda path never accumulates events.
+    """
+
+    def __init__(self, maxsize=QUEUE_SIZE):
+        self.queue = queue.Queue(maxsize)
+        self.enabled = False
+        self.dropped = 0
+
+    def put(self, event):
+        if not event["stocks"]:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+            logger.warning(f"⚠️ Event queue full, dropped event for {event['stocks']}")
+
+    def publish(self, documents, source):
+        if not self.enabled:
+            return
+        for document in documents:
+            self.put(document_event(document, source))
+
+bus = EventBus()
+
+def publish_documents(documents, source):
+    """Called by ingestion right after new documents (and their summary rows) are stored."""
+    bus.publish(documents, source)
+
+def change_streams_available():
+    """Change streams need a replica set or sharded cluster."""
+    from DB import dbConnection
+    hello = dbConnection.client.admin.command("hello")
+    return "setName" in hello or hello.get("msg") == "isdbgrid"
+
+class ChangeStreamWatcher(threading.Thread):
+    """Feeds inserts on one collection into the bus, resuming after errors from the last token seen."""
+
+    def __init__(self, source, collection, event_bus, stop_event):
+        super().__init__(name=f"watch-{source}", daemon=True)
+        self.source = source
+        self.collection = collection
+        self.bus = event_bus
+        self.stop_event = stop_event
+        self.resume_token = None
+
+    def run(self):
+        pipeline = [
+            {"$match": {"operationType": "insert"}},
+            {"$project": {"fullDocument.stocks": 1, "fullDocument.stock": 1, "fullDocument.timestamp": 1}}
+        ]
+        while not self.stop_event.is_set():
+            try:
+                with self.collection.watch(pipeline, resume_after=self.resume_token, max_await_time_ms=1000) as stream:
+                    while not self.stop_event.is_set():
+                        change = stream.try_next()
+                        if change is None:
+                            continue
+                        self.resume_token = stream.resume_token
+                        self.bus.put(document_event(change["fullDocument"], self.source))
+            except Exception as e:
+                logger.warning(f"🔁 Change stream on {self.source} failed ({e}), reconnecting...")
+                self.stop_event.wait(1)
+
+class TradingWorker(threading.Thread):
+    """
+    Consumes sentiment events, debounces them per ticker and re-evaluates only
+    the tickers whose window closed, recording ingest -> decision -> order latency.
+    With market_hours, events whose window closes outside the session are
+    dropped; the first scheduled run at the open covers them.
+    """
+
+    def __init__(self, event_bus, debounce=DEBOUNCE_SECONDS, trade=None, clock=time.monotonic,
+                 market_hours=MARKET_HOURS, market_open=None, wall_clock=time.time):
+        super().__init__(name="event-trading", daemon=True)
+        self.bus = event_bus
+        self.debounce = debounce
+        self.trade = trade
+        self.clock = clock
+        self.market_hours = market_hours
+        self.market_open = market_open
+        self.wall_clock = wall_clock
+        self.skipped = 0
+        self.pending = {}
+        self.stop_event = threading.Event()
+
+    def add(self, event):
+        now = self.clock()
+        for stock in event["stocks"]:
+            pending = self.pending.setdefault(stock, {"deadline": now + self.debounce, "ingested_at": None, "events": 0})
+            pending["events"] += 1
+            ingested_at = event.get("ingested_at")
+            if ingested_at and (pending["ingested_at"] is None or ingested_at < pending["ingested_at"]):
+                pending["ingested_at"] = ingested_at
+
+    def due(self):
+        """Pop and return {stock: pending} for every ticker whose debounce window has closed."""
+        now = self.clock()
+        ready = {stock: pending for stock, pending in self.pending.items() if pending["deadline"] <= now}
+        for stock in ready:
+            del self.pending[stock]
+        return ready
+
+    def evaluate(self, ready):
+        """
+        Re-evaluate the given tickers in one trading pass and record their signal
+        latencies. execute_trades serializes this with the scheduled trading job.
+        """
+        if self.market_hours:
+            market_open = self.market_open
+            if market_open is None:
+                from utils.scheduler import is_market_open as market_open
+            if not market_open(self.wall_clock()):
+                self.skipped += len(ready)
+                logger.info(f"🌙 Market closed, not trading on events for {list(ready)}")
+                return {}
+
+        trade = self.trade
+        if trade is None:
+            from utils.tradingModel import execute_trades as trade
+
+        contexts = {
+            stock: {"trigger": "event", "ingested_at": pending["ingested_at"], "events": pending["events"]}
+            for stock, pending in ready.items()
+        }
+        results = trade(stocks=list(ready), contexts=contexts) or {}
+
+        for stock, (decision_entry, trade_entry) in results.items():
+            decision_latency = decision_entry.get("signal_latency_ms")
+            if decision_latency is not None:
+                metrics.record("event.ingest_to_decision", decision_latency, items=1)
+            if trade_entry and trade_entry.get("signal_latency_ms") is not None:
+                metrics.record("event.ingest_to_order", trade_entry["signal_latency_ms"], items=1)
+                metrics.record("event.decision_to_order", trade_entry["signal_latency_ms"] - (decision_latency or 0), items=1)
+            logger.info(
+                f"⚡ {stock}: {decision_entry['decision']} after {ready[stock]['events']} event(s), "
+                f"ingest->decision {decision_latency}ms"
+                + (f", ingest->order {trade_entry['signal_latency_ms']}ms" if trade_entry else "")
+            )
+        return results
+
+    def timeout(self):
+        if not self.pending:
+            return 1.0
+        return max(min(pending["deadline"] for pending in self.pending.values()) - self.clock(), 0)
+
+    def run(self):
+        logger.info(f"⚡ Event trading started (debounce {self.debounce}s)")
+        while not self.stop_event.is_set():
+            try:
+                self.add(self.bus.queue.get(timeout=self.timeout()))
+                # Drain whatever else is queued before checking deadlines
+                while True:
+                    self.add(self.bus.queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            ready = self.due()
+            if ready:
+                try:
+                    self.evaluate(ready)
+                except Exception:
+                    logger.exception(f"❌ Event trading failed for {list(ready)}")
+
+    def stop(self):
+        self.stop_event.set()
+
+class EventTrading:
+    """Handle for a running worker and its change stream watchers."""
+
+    def __init__(self, worker, watchers):
+        self.worker = worker
+        self.watchers = watchers
+
+    def stop(self, timeout=None):
+        bus.enabled = False
+        self.worker.stop()
+        self.worker.join(timeout)
+        for watcher in self.watchers:
+            watcher.join(timeout)
+
+def start_event_trading(source=EVENT_SOURCE, debounce=DEBOUNCE_SECONDS, trade=None, market_hours=MARKET_HOURS):
+    """
+    Start the trading worker fed by the in-process queue or by change streams.
+    market_hours limits event trading to the regular session.
+    Returns an EventTrading handle; call stop() on shutdown.
+    """
+    if source == "auto":
+        source = "change_stream" if change_streams_available() else "queue"
+
+    worker = TradingWorker(bus, debounce, trade, market_hours=market_hours)
+    watchers = []
+    if source == "change_stream":
+        from DB import dbConnection
+        watchers = [
+            ChangeStreamWatcher(name, getattr(dbConnection, handle), bus, worker.stop_event)
+            for name, handle in WATCHED_COLLECTIONS.items()
+        ]
+    elif source == "queue":
+        bus.enabled = True
+    else:
+        raise ValueError(f"Unknown EVENT_SOURCE {source!r}; use queue, change_stream or auto")
+
+    for thread in [worker, *watchers]:
+        thread.start()
+    logger.info(f"⚡ Event source: {source}")
+    return EventTrading(worker, watchers)
+
+if __name__ == "__main__":
+    # Standalone worker next to a separately running ingestion (Lambda or daemon),
+    # so events have to come from change streams.
+    import signal
+
+    handle = start_event_trading("change_stream")
+    signal.signal(signal.SIGTERM, lambda signum, frame: handle.worker.stop())
+    try:
+        while handle.worker.is_alive():
+            handle.worker.join(1)
+    except KeyboardInterrupt:
+        pass
+    handle.stop(timeout=30)
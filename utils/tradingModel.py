@@ -1,69 +1,83 @@
 import logging
-from APIs.alpacaAPI import get_account_info, get_stock_data, place_trade, check_stock_ownership
-from pymongo import MongoClient
 import os
+import threading
+from utils.marketSnapshot import MarketSnapshot
+from utils.orderExecutor import load_plans, new_run_id, record_plans, record_run, submit_orders
+from utils.orderTracker import get_order_tracker
+from utils.sentimentAggregation import aggregate_ticker_sentiment
+from utils.sentimentSummary import summarize_window, summary_covers
+from baseAPI import market_window_start
+from utils import clock
+from utils.metrics import timed
 from dotenv import load_dotenv
-from datetime import datetime
 
 load_dotenv()
 
+# Market filters: skip wide quotes and thinly traded tickers (volume over the
+# quote book's rolling window)
+MAX_SPREAD = float(os.getenv("TRADE_MAX_SPREAD", 5))
+MIN_VOLUME = int(os.getenv("TRADE_MIN_VOLUME", 10000))
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-MONGO_URI = os.getenv("MONGO_URI")
-if not MONGO_URI:
-    raise ValueError("MONGO_URI is not set in the .env file")
-
-client = MongoClient(MONGO_URI)
-db = client["tradingData"]
-
-sentiment_collection = db["sentiment_data"]
-stock_data_collection = db["stock_data"]
-trade_decision_collection = db["trade_decisions"]
+# One trading pass at a time per process: the scheduled job and event-driven
+# runs (utils/tradeEvents.py) would otherwise plan against the same cash and
+# positions concurrently
+_run_lock = threading.Lock()
 
-def get_latest_sentiment_stocks():
+def get_latest_sentiment_stocks(stocks=None):
     """
-    Fetch the latest stocks mentioned in sentiment data.
+    Fetch per-ticker sentiment over the market window from the incrementally
+    maintained summary buckets (falling back to the raw aggregation when the
+    summary doesn't cover the whole window). sentiment_score is the time-decayed mean vader_score and
+    expected_impact the mean impact; the other window statistics pass through.
+    stocks limits the lookup to those tickers.
     """
-    stock_mentions = {}
-
-    collections = ["sentimentData.news_articles", "sentimentData.reddit_posts"]
+    window_start = market_window_start()
+    if summary_covers(window_start):
+        window_stats = summarize_window(window_start, stocks=stocks)
+    else:
+        window_stats = aggregate_ticker_sentiment(window_start, stocks=stocks)
 
-    for collection_name in collections:
-        collection = client["sentimentData"][collection_name.split(".")[1]]
-        recent_sentiments = collection.find({}, sort=[("timestamp", -1)]).limit(5)
+    stock_mentions = {}
+    for stock, stats in window_stats.items():
+        stock_mentions[stock] = {
+            "sentiment_score": stats["decayed_sentiment"],
+            "expected_impact": stats["mean_impact"],
+            **stats
+        }
 
-        for sentiment_data in recent_sentiments:
-            stock = sentiment_data.get("stock")
-            if stock:
-                stock_mentions[stock] = {
-                    "sentiment_score": sentiment_data["sentiment"]["vader_score"],
-                    "expected_impact": sentiment_data["expected_impact"]
-                }
-    
     return stock_mentions
 
-def evaluate_trade(symbol, sentiment_score, expected_impact):
+def evaluate_trade(symbol, sentiment_score, expected_impact, snapshot=None):
     """
     Aggressive trade evaluation:
     - Favor action (buy/sell) over holding
     - Use sentiment, expected impact, and minimal market filters
+    Reads quotes and ownership from the run's MarketSnapshot (built if not given).
     """
     if sentiment_score is None or expected_impact is None:
         return "hold"
 
-    stock_data = get_stock_data(symbol)
+    if snapshot is None:
+        snapshot = MarketSnapshot.build([symbol])
+
+    stock_data = snapshot.quote(symbol)
     if not stock_data:
         logger.warning(f"❌ No stock data available for {symbol}")
         return "hold"
 
     spread = stock_data["spread"]
     volume = stock_data["volume"]
-    owned_shares = check_stock_ownership(symbol)
+    owned_shares = snapshot.owned_shares(symbol)
     owns_stock = owned_shares is not None and owned_shares > 0
 
-    # if spread > 5 or volume < 10000:
-    #     return "hold"
+    if spread > MAX_SPREAD:
+        return "hold"
+    # REST quotes carry no volume; only the streaming quote book can apply this filter
+    if volume is not None and volume < MIN_VOLUME:
+        return "hold"
 
     if sentiment_score > 0.6 and expected_impact > 1:
         return "buy"
@@ -76,80 +90,150 @@ def evaluate_trade(symbol, sentiment_score, expected_impact):
 
 
 
-def execute_trades():
+def signal_latency_ms(context, at):
+    """Milliseconds from the triggering ingestion (context["ingested_at"]) to at, if known."""
+    ingested_at = (context or {}).get("ingested_at")
+    if ingested_at is None:
+        return None
+    return round((at - ingested_at).total_seconds() * 1000, 1)
+
+def plan_trade(symbol, data, snapshot, context=None):
     """
-    Evaluate all stocks with recent sentiment and place trades accordingly.
-    Also stores every stock query and trade decision in MongoDB.
+    Decide on one symbol and work out the order to place, if any, reserving its
+    cash/shares on the snapshot so later symbols in the run see the effect.
+    context (e.g. the triggering event) is merged into the decision entry; when it
+    carries "ingested_at" the entry also gets signal_latency_ms.
+    Returns (decision_entry, order); order is None when nothing should be placed.
     """
-    stock_mentions = get_latest_sentiment_stocks()
-    if not stock_mentions:
-        logger.info("🚫 No stocks with relevant sentiment data.")
-        return
-
-    for symbol, data in stock_mentions.items():
-        sentiment_score = data["sentiment_score"]
-        expected_impact = data["expected_impact"]
-        decision = evaluate_trade(symbol, sentiment_score, expected_impact)
-
-        # ✅ Log trade decision in MongoDB (including HOLD actions)
-        trade_decision_entry = {
-            "stock": symbol,
-            "decision": decision,
-            "sentiment_score": sentiment_score,
-            "expected_impact": expected_impact,
-            "timestamp": datetime.utcnow()
-        }
-        trade_decision_collection.insert_one(trade_decision_entry)
-        logger.info(f"📊 Trade Decision Stored: {trade_decision_entry}")
-
-        if decision == "buy":
-
-            account_info = get_account_info()
-            if not account_info:
-                logger.warning("⚠️ Skipping trade — couldn't fetch account info.")
-                continue
-
-            available_cash = float(account_info["cash"])
-            price = get_stock_data(symbol)["last_trade_price"]
-
-            if available_cash < price:
-                logger.warning(f"💸 Not enough cash to buy 1 share of {symbol}. Needed: ${price:.2f}, Available: ${available_cash:.2f}")
-                continue
-            
-            logger.info(f"📈 Executing BUY order for {symbol}")
-            trade_info = place_trade(symbol, 1, "buy")
-
-        elif decision == "sell":
-            # ✅ Check if stock is owned before selling
-            owned_shares = check_stock_ownership(symbol)
-            if owned_shares is None:
-                logger.warning(f"⚠️ Could not determine if {symbol} is owned. Skipping sell.")
-                continue
-            elif owned_shares > 0:
-                logger.info(f"📉 Selling {owned_shares} shares of {symbol}")
-                trade_info = place_trade(symbol, owned_shares, "sell")
-            else:
-                logger.warning(f"⚠️ Cannot sell {symbol}, no shares owned.")
-                continue
-
+    sentiment_score = data["sentiment_score"]
+    expected_impact = data["expected_impact"]
+    decision = evaluate_trade(symbol, sentiment_score, expected_impact, snapshot)
+
+    # ✅ Trade decision for MongoDB (including HOLD actions)
+    trade_decision_entry = {
+        "stock": symbol,
+        "decision": decision,
+        "sentiment_score": sentiment_score,
+        "expected_impact": expected_impact,
+        "timestamp": clock.utcnow(),
+        **(context or {})
+    }
+    latency = signal_latency_ms(context, trade_decision_entry["timestamp"])
+    if latency is not None:
+        trade_decision_entry["signal_latency_ms"] = latency
+    logger.info(f"📊 Trade Decision: {trade_decision_entry}")
+
+    # With order tracking running, the open-order table (fed by trade_updates)
+    # says whether an earlier order for the symbol is still working
+    tracker = get_order_tracker()
+    if decision != "hold" and tracker and tracker.has_open_order(symbol):
+        logger.info(f"⏳ {symbol} still has an open order, not placing another.")
+        return trade_decision_entry, None
+
+    if decision == "buy":
+
+        if snapshot.cash is None:
+            logger.warning("⚠️ Skipping trade — couldn't fetch account info.")
+            return trade_decision_entry, None
+
+        available_cash = snapshot.cash
+        price = snapshot.quote(symbol)["last_trade_price"]
+
+        if available_cash < price:
+            logger.warning(f"💸 Not enough cash to buy 1 share of {symbol}. Needed: ${price:.2f}, Available: ${available_cash:.2f}")
+            return trade_decision_entry, None
+
+        logger.info(f"📈 Queueing BUY order for {symbol}")
+        snapshot.apply_trade(symbol, "buy", 1, price)
+        return trade_decision_entry, {"symbol": symbol, "qty": 1, "side": "buy"}
+
+    elif decision == "sell":
+        # ✅ Check if stock is owned before selling
+        owned_shares = snapshot.owned_shares(symbol)
+        if owned_shares is None:
+            logger.warning(f"⚠️ Could not determine if {symbol} is owned. Skipping sell.")
+            return trade_decision_entry, None
+        elif owned_shares > 0:
+            logger.info(f"📉 Queueing SELL of {owned_shares} shares of {symbol}")
+            snapshot.apply_trade(symbol, "sell", owned_shares, snapshot.quote(symbol)["last_trade_price"])
+            return trade_decision_entry, {"symbol": symbol, "qty": owned_shares, "side": "sell"}
         else:
-            logger.info(f"🤔 Holding {symbol}, no action taken.")
-            trade_info = None  # No trade executed for hold
-
-        # ✅ Log executed trade (only if a trade was made)
-        if trade_info:
-            trade_entry = {
-                "stock": symbol,
-                "decision": decision,
-                "quantity": owned_shares if decision == "sell" else 1,
-                "filled_avg_price": trade_info.get("filled_avg_price"),
-                "status": trade_info["status"],
-                "submitted_at": trade_info["submitted_at"],
-                "timestamp": datetime.utcnow()
+            logger.warning(f"⚠️ Cannot sell {symbol}, no shares owned.")
+            return trade_decision_entry, None
+
+    logger.info(f"🤔 Holding {symbol}, no action taken.")
+    return trade_decision_entry, None
+
+def build_trade_entry(order, trade_info, context=None):
+    """The trade_decisions record of a placed order, with signal_latency_ms when context has "ingested_at"."""
+    trade_entry = {
+        "stock": order["symbol"],
+        "decision": order["side"],
+        "quantity": order["qty"],
+        "order_id": trade_info.get("id"),
+        "client_order_id": trade_info.get("client_order_id"),
+        "filled_avg_price": trade_info.get("filled_avg_price"),
+        "status": trade_info["status"],
+        "submitted_at": trade_info["submitted_at"],
+        "timestamp": clock.utcnow(),
+        **(context or {})
+    }
+    latency = signal_latency_ms(context, trade_entry["timestamp"])
+    if latency is not None:
+        trade_entry["signal_latency_ms"] = latency
+    return trade_entry
+
+def execute_trades(stocks=None, contexts=None, run_id=None):
+    """
+    Evaluate all stocks with recent sentiment (or just the given ones) and place
+    trades accordingly. Decisions are made in order against the run's snapshot,
+    then stored (keyed by run_id) before the resulting orders are submitted
+    concurrently; the placed trades are stored with one write per collection.
+    contexts optionally maps symbol -> context for plan_trade. Re-running with
+    the same run_id replays the decisions already stored for it and resubmits
+    their orders under the same deterministic client_order_ids, so a retry
+    can't place anything twice; only symbols it hadn't decided on are planned.
+    A run started while another is in progress waits for it.
+    Returns {symbol: (decision_entry, trade_entry)}.
+    """
+    with _run_lock:
+        plans = load_plans(run_id) if run_id else {}
+        run_id = run_id or new_run_id()
+        if plans:
+            logger.info(f"♻️ Run {run_id} was already planned, replaying {len(plans)} decisions")
+        with timed("trading.sentiment_window") as stage:
+            stock_mentions = {
+                symbol: data for symbol, data in get_latest_sentiment_stocks(stocks).items() if symbol not in plans
             }
-            trade_decision_collection.insert_one(trade_entry)
-            logger.info(f"✅ Trade logged: {trade_entry}")
-
+            stage.add_items(len(stock_mentions))
+        if not stock_mentions and not plans:
+            logger.info("🚫 No stocks with relevant sentiment data.")
+            return {}
+
+        contexts = contexts or {}
+        if stock_mentions:
+            # Account, positions and quotes for every symbol: three broker calls per run
+            with timed("trading.snapshot"):
+                snapshot = MarketSnapshot.build(stock_mentions.keys())
+
+            new_plans = {
+                symbol: plan_trade(symbol, data, snapshot, contexts.get(symbol))
+                for symbol, data in stock_mentions.items()
+            }
+            record_plans(run_id, new_plans)
+            plans.update(new_plans)
+        submitted = submit_orders([order for _, order in plans.values() if order], run_id)
+
+        results = {}
+        for symbol, (decision_entry, order) in plans.items():
+            trade_info = submitted.get(symbol)
+            trade_entry = build_trade_entry(order, trade_info, contexts.get(symbol)) if trade_info else None
+            results[symbol] = (decision_entry, trade_entry)
+
+        record_run(run_id, results, [trade_info for trade_info in submitted.values() if trade_info])
+        logger.info(f"✅ Trading run {run_id}: {len(plans)} decisions, "
+                    f"{sum(1 for _, trade_entry in results.values() if trade_entry)} orders placed")
+        return results
 
 if __name__ == "__main__":
     execute_trades()